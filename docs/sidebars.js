@@ -12,6 +12,7 @@ module.exports = {
         "parameters",
         "adding-devices",
         "commands",
+        "connections",
         "logging",
         "messages",
         "query-settings",
@@ -8,7 +8,7 @@ from pathlib import Path
 # Third Party
 from fastapi import FastAPI
 from fastapi.exceptions import ValidationError, RequestValidationError
-from starlette.responses import JSONResponse
+from starlette.responses import JSONResponse, StreamingResponse
 from starlette.exceptions import HTTPException as StarletteHTTPException
 from fastapi.openapi.utils import get_openapi
 from starlette.staticfiles import StaticFiles
@@ -22,10 +22,13 @@ from hyperglass.api.events import on_startup, on_shutdown
 from hyperglass.api.routes import (
     docs,
     info,
+    batch,
     query,
     queries,
     routers,
     communities,
+    stream_query,
+    invalidate_cache,
     import_certificate,
 )
 from hyperglass.exceptions import HyperglassError
@@ -240,6 +243,55 @@ app.add_api_route(
     response_class=JSONResponse,
 )
 
+app.add_api_route(
+    path="/api/query/stream/",
+    endpoint=stream_query,
+    methods=["POST"],
+    summary=params.docs.stream.summary,
+    description=params.docs.stream.description,
+    responses={
+        200: {
+            "content": {"text/event-stream": {}},
+            "description": "Output lines, followed by the complete query response",
+        },
+        400: {"model": QueryError, "description": "Request Content Error"},
+        422: {"model": QueryError, "description": "Request Format Error"},
+        500: {"model": QueryError, "description": "Server Error"},
+    },
+    response_class=StreamingResponse,
+    tags=[params.docs.stream.title],
+)
+
+# Enable batch query route only if enabled.
+if params.batch.enable:
+    app.add_api_route(
+        path="/api/query/batch/",
+        endpoint=batch,
+        methods=["POST"],
+        summary=params.docs.batch.summary,
+        description=params.docs.batch.description,
+        responses={
+            200: {
+                "content": {"application/x-ndjson": {}},
+                "description": "One JSON object per location, per line",
+            },
+            400: {"model": QueryError, "description": "Request Content Error"},
+            422: {"model": QueryError, "description": "Request Format Error"},
+            500: {"model": QueryError, "description": "Server Error"},
+        },
+        response_class=StreamingResponse,
+        tags=[params.docs.batch.title],
+    )
+
+# Enable cache invalidation route only if enabled.
+if params.cache.invalidation.enable:
+    app.add_api_route(
+        path="/api/cache/",
+        endpoint=invalidate_cache,
+        methods=["DELETE"],
+        include_in_schema=False,
+    )
+
 # Enable certificate import route only if a device using
 # hyperglass-agent is defined.
 if [n for n in devices.all_nos if n in TRANSPORT_REST]:
@@ -1,16 +1,80 @@
 """API Events."""
 
+# Standard Library
+import asyncio
+from typing import List
+
 # Project
-from hyperglass.cache import AsyncCache
-from hyperglass.configuration import REDIS_CONFIG, params
+from hyperglass.log import log
+from hyperglass.cache import use_cache
+from hyperglass.external import pfx2as
+from hyperglass.util.files import WatchedFile
+from hyperglass.api.warming import WARMER
+from hyperglass.configuration import params
+from hyperglass.external.rpki import use_vrps
+from hyperglass.execution.drivers.agent import AGENT_CLIENTS
+from hyperglass.execution.drivers._common import TUNNELS
+from hyperglass.execution.drivers.ssh_netmiko import NETMIKO_EXECUTOR
+from hyperglass.execution.drivers.ssh_scrapli import SESSION_POOL
 
 
 async def check_redis() -> bool:
     """Ensure Redis is running before starting server."""
-    cache = AsyncCache(db=params.cache.database, **REDIS_CONFIG)
-    await cache.test()
+    await use_cache().test()
+    return True
+
+
+async def watch_cache() -> bool:
+    """Start evicting entries written by other workers from the local cache."""
+    use_cache().watch()
+    return True
+
+
+async def warm_cache() -> bool:
+    """Start running popular & configured queries in the background."""
+    if params.cache.warming.enable:
+        WARMER.start(use_cache())
+    return True
+
+
+def watched_files() -> List[WatchedFile]:
+    """Get each configured local data file."""
+    files = []
+    if params.structured.rpki.mode == "local":
+        files.append(use_vrps())
+    if pfx2as.enabled():
+        files.append(pfx2as.use_pfx2as())
+    return files
+
+
+async def watch_files() -> bool:
+    """Load local data files & reload them in the background when they change."""
+    loop = asyncio.get_event_loop()
+
+    for watched in watched_files():
+        # Load each file before serving requests, so requests don't wait
+        # for the first load.
+        try:
+            await loop.run_in_executor(None, watched.reload)
+        except Exception as err:
+            log.error("Error loading {}: {}", str(watched.path), str(err))
+        watched.start()
+
+    return True
+
+
+async def close_sessions() -> bool:
+    """Close any pooled device sessions & tunnels before stopping the server."""
+    await SESSION_POOL.close()
+    await AGENT_CLIENTS.close()
+    await TUNNELS.close()
+    NETMIKO_EXECUTOR.shutdown()
+    use_cache().unwatch()
+    WARMER.stop()
+    for watched in watched_files():
+        watched.stop()
     return True
 
 
-on_startup = (check_redis,)
-on_shutdown = ()
+on_startup = (check_redis, watch_cache, warm_cache, watch_files)
+on_shutdown = (close_sessions,)
@@ -0,0 +1,65 @@
+"""Count how often each query is requested."""
+
+# Standard Library
+import time
+from typing import Dict, List, Tuple
+
+# Project
+from hyperglass.cache import AsyncCache
+from hyperglass.models.api import Query
+from hyperglass.configuration import params
+
+POPULARITY_KEY = "hyperglass.query.popularity"
+QUERIES_KEY = "hyperglass.query.popular"
+
+
+def enabled() -> bool:
+    """Determine if requests for each query should be counted."""
+    return params.cache.adaptive.enable or params.cache.warming.enable
+
+
+def windows() -> Tuple[str, str]:
+    """Get the keys of the current & previous popularity windows."""
+    window = params.cache.popularity_window
+    current = int(time.time() // window)
+    return (f"{POPULARITY_KEY}.{current}", f"{POPULARITY_KEY}.{current - 1}")
+
+
+async def record(cache: AsyncCache, cache_key: str) -> None:
+    """Count a request for a query."""
+    current, _ = windows()
+    await cache.count(current, cache_key, seconds=params.cache.popularity_window * 2)
+
+
+async def requests(cache: AsyncCache, cache_key: str) -> int:
+    """Get the number of recent requests for a query."""
+    return int(await cache.counts(windows(), cache_key))
+
+
+async def popular(cache: AsyncCache, count: int) -> List[str]:
+    """Get the cache keys of the most requested recent queries."""
+    return await cache.top(windows(), count)
+
+
+def query_key(cache_key: str) -> str:
+    """Get the key of a query's stored parameters."""
+    return f"{QUERIES_KEY}.{cache_key}"
+
+
+async def remember(cache: AsyncCache, cache_key: str, query_data: Query) -> None:
+    """Store a query's parameters, so it can be run again by its cache key.
+
+    Each query's parameters expire on their own, so only recently
+    requested queries are kept.
+    """
+    await cache.set_many(
+        {query_key(cache_key): query_data.export_dict()},
+        seconds=params.cache.popularity_window * 2,
+    )
+
+
+async def popular_queries(cache: AsyncCache, count: int) -> List[Dict]:
+    """Get the parameters of the most requested recent queries."""
+    cache_keys = await popular(cache, count)
+    queries = await cache.get_many([query_key(k) for k in cache_keys])
+    return [q for q in queries if q is not None]
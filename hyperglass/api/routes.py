@@ -3,31 +3,49 @@
 # Standard Library
 import os
 import json
+import math
 import time
+import asyncio
+import secrets
+from typing import Dict, Tuple, Union, Callable, Optional, Sequence, Awaitable
 from datetime import datetime
+from functools import lru_cache
 
 # Third Party
-from fastapi import HTTPException, BackgroundTasks
+from fastapi import Header, HTTPException, BackgroundTasks
 from starlette.requests import Request
+from starlette.responses import StreamingResponse
 from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html
 
 # Project
+from hyperglass.api import popularity
 from hyperglass.log import log
-from hyperglass.cache import AsyncCache
+from hyperglass.cache import AsyncCache, use_cache
 from hyperglass.encode import jwt_decode
 from hyperglass.external import Webhook, bgptools
 from hyperglass.api.tasks import process_headers, import_public_key
-from hyperglass.constants import __version__
+from hyperglass.constants import SUPPORTED_QUERY_TYPES, __version__
 from hyperglass.exceptions import HyperglassError
-from hyperglass.models.api import Query, EncodedRequest
-from hyperglass.configuration import REDIS_CONFIG, params, devices
-from hyperglass.execution.main import execute
+from hyperglass.models.api import Query, BatchQuery, EncodedRequest
+from hyperglass.util.tasks import run_in_background
+from hyperglass.configuration import params, devices
+from hyperglass.execution.main import execute, execute_stream
+from hyperglass.models.api.query import cache_namespace
+from hyperglass.execution.drivers.agent import AGENT_CLIENTS
 
 # Local
 from .fake_output import fake_output
 
 APP_PATH = os.environ["hyperglass_directory"]
 
+SINGLE_FLIGHT_LEASE = "hyperglass.query.lease"
+SINGLE_FLIGHT_CHANNEL = "hyperglass.query.done"
+
+# Query types whose output can be streamed as the device produces it.
+STREAMED_QUERY_TYPES = ("ping", "traceroute")
+
+Executor = Callable[[Query], Awaitable[Union[str, Sequence[Dict]]]]
+
 
 async def send_webhook(query_data: Query, request: Request, timestamp: datetime):
     """If webhooks are enabled, get request info and send a webhook.
@@ -69,88 +87,260 @@ async def send_webhook(query_data: Query, request: Request, timestamp: datetime)
         )
 
 
-async def query(query_data: Query, request: Request, background_tasks: BackgroundTasks):
-    """Ingest request data pass it to the backend application to perform the query."""
+def structured_output(query_data: Query) -> bool:
+    """Determine if a query's output is structured (parsed) data."""
+    return query_data.device.structured_output and query_data.query_type in (
+        "bgp_route",
+        "bgp_community",
+        "bgp_aspath",
+    )
 
-    timestamp = datetime.utcnow()
-    background_tasks.add_task(send_webhook, query_data, request, timestamp)
 
-    # Initialize cache
-    cache = AsyncCache(db=params.cache.database, **REDIS_CONFIG)
-    log.debug("Initialized cache {}", repr(cache))
+def query_timeout(query_type: str) -> int:
+    """Get the time in seconds a query type's output is fresh in the cache."""
+    timeout = getattr(params.cache.timeouts, query_type)
+
+    if timeout is None:
+        return params.cache.timeout
+
+    return timeout
 
-    # Use hashed query_data string as key for for k/v cache store so
-    # each command output value is unique.
-    cache_key = query_data.digest()
 
-    # Define cache entry expiry time
-    cache_timeout = params.cache.timeout
+def cache_expiry(timeout: int) -> int:
+    """Get the time in seconds a cache entry is kept, including while stale."""
+    return timeout + params.cache.stale_while_revalidate
+
+
+async def entry_timeout(
+    cache: AsyncCache, query_data: Query, cache_key: str, runtime: float
+) -> int:
+    """Get the time in seconds a query's output is fresh in the cache.
+
+    If adaptive timeouts are enabled, output that took longer to produce
+    or has been requested more often is cached for longer.
+    """
+    timeout = query_timeout(query_data.query_type)
+    adaptive = params.cache.adaptive
+
+    if not adaptive.enable:
+        return timeout
+
+    count = await popularity.requests(cache, cache_key)
+    timeout *= (1 + math.log2(1 + count)) * (1 + runtime / 10)
+
+    return int(min(max(timeout, adaptive.min_timeout), adaptive.max_timeout))
+
+
+async def run_query(
+    cache: AsyncCache,
+    query_data: Query,
+    cache_key: str,
+    json_output: bool,
+    executor: Executor = execute,
+) -> Tuple[Dict, int]:
+    """Execute a query, write its output to the cache, and return it & its runtime."""
+
+    starttime = time.time()
+
+    if params.fake_output:
+        # Return fake, static data for development purposes, if enabled.
+        cache_output = await fake_output(json_output)
+    else:
+        # Pass request to execution module
+        cache_output = await executor(query_data)
+
+    endtime = time.time()
+    elapsedtime = round(endtime - starttime, 4)
+    log.debug("Query {} took {} seconds to run.", cache_key, elapsedtime)
+
+    if cache_output is None:
+        raise HyperglassError(message=params.messages.general, alert="danger")
+
+    timeout = await entry_timeout(cache, query_data, cache_key, elapsedtime)
+
+    # Create a cache entry. Structured output is stored as-is, & is
+    # returned from the cache with the same type.
+    if not json_output:
+        cache_output = str(cache_output)
+    entry = {
+        "output": cache_output,
+        "timestamp": query_data.timestamp,
+        "fresh_until": time.time() + timeout,
+    }
+    await cache.set_entry(cache_key, entry, seconds=cache_expiry(timeout))
+
+    if params.cache.warming.enable:
+        await popularity.remember(cache, cache_key, query_data)
+
+    log.debug("Added cache entry for query: {}", cache_key)
+
+    return entry, int(round(elapsedtime, 0))
+
+
+async def lead_query(
+    cache: AsyncCache,
+    query_data: Query,
+    cache_key: str,
+    json_output: bool,
+    executor: Executor = execute,
+) -> Tuple[Dict, int]:
+    """Execute a query while holding its lease & notify waiting followers."""
+
+    status = {"error": None, "level": "danger"}
+
+    try:
+        return await run_query(cache, query_data, cache_key, json_output, executor)
+
+    except HyperglassError as err:
+        status = {"error": str(err), "level": err.level}
+        raise
+
+    except BaseException:
+        status = {"error": params.messages.general, "level": "danger"}
+        raise
+
+    finally:
+        # The cache entry is written before the lease is released, so
+        # any caller that misses the lease will find the output.
+        await cache.delete(f"{SINGLE_FLIGHT_LEASE}.{cache_key}")
+        await cache.pub(f"{SINGLE_FLIGHT_CHANNEL}.{cache_key}", status, 0)
+
+
+async def refresh_query(
+    cache: AsyncCache, query_data: Query, cache_key: str, json_output: bool
+) -> None:
+    """Replace a stale cache entry in the background, while holding its lease."""
+
+    log.debug("Refreshing stale cache entry for query {}", cache_key)
+
+    try:
+        await lead_query(cache, query_data, cache_key, json_output)
+    except Exception as err:
+        log.error("Error refreshing query {}: {}", query_data.summary, str(err))
+
+
+async def follow_query(cache: AsyncCache, cache_key: str) -> Dict:
+    """Wait for an identical query being executed by another caller to complete.
+
+    Returns an empty entry if the output was evicted before it was read.
+    """
+
+    log.debug("Query {} is in flight, waiting for its result", cache_key)
+
+    channel = f"{SINGLE_FLIGHT_CHANNEL}.{cache_key}"
+    pubsub = await cache.pubsub()
+    await pubsub.subscribe(channel)
+
+    try:
+        # The leading caller may have completed between the initial
+        # cache miss and the subscription.
+        entry = await cache.get_entry(cache_key)
+        if entry:
+            return entry
+
+        status = await cache.wait(pubsub, timeout=params.request_timeout)
+
+    finally:
+        await pubsub.unsubscribe(channel)
+
+    if status is None:
+        raise HyperglassError(params.messages.request_timeout, level="danger")
+
+    if status.get("error") is not None:
+        raise HyperglassError(status["error"], level=status["level"])
+
+    return await cache.get_entry(cache_key)
+
+
+async def process_query(
+    cache: AsyncCache, query_data: Query, executor: Executor = execute
+) -> Dict:
+    """Get a query's response from the cache, or execute it."""
+
+    # Use the query's namespaced digest as the key for the k/v cache
+    # store, so each command output value is unique.
+    cache_key = query_data.cache_key()
+
+    # Define cache entry expiry time. Adaptive timeouts are set per
+    # entry when it is written, so they're not reset when it is read.
+    cache_timeout = None
+    if not params.cache.adaptive.enable:
+        cache_timeout = cache_expiry(query_timeout(query_data.query_type))
 
     log.debug("Cache Timeout: {}", cache_timeout)
     log.info("Starting query execution for query {}", query_data.summary)
 
-    cache_response = await cache.get_dict(cache_key, "output")
+    if popularity.enabled():
+        await popularity.record(cache, cache_key)
 
-    json_output = False
+    # Get the entry & reset its expiration time in a single round trip.
+    entry = await cache.get_entry(cache_key, seconds=cache_timeout)
 
-    if query_data.device.structured_output and query_data.query_type in (
-        "bgp_route",
-        "bgp_community",
-        "bgp_aspath",
-    ):
-        json_output = True
+    json_output = structured_output(query_data)
 
     cached = False
+    stale = False
     runtime = 65535
-    if cache_response:
+    if entry:
         log.debug("Query {} exists in cache", cache_key)
 
-        # If a cached response exists, reset the expiration time.
-        await cache.expire(cache_key, seconds=cache_timeout)
-
         cached = True
         runtime = 0
-        timestamp = await cache.get_dict(cache_key, "timestamp")
 
-    elif not cache_response:
+        fresh_until = entry.get("fresh_until", 0)
+
+        if params.cache.stale_while_revalidate and time.time() > fresh_until:
+            # Respond with the stale entry immediately, & let a single
+            # caller refresh it in the background.
+            stale = True
+            if await cache.lease(
+                f"{SINGLE_FLIGHT_LEASE}.{cache_key}", seconds=params.request_timeout
+            ):
+                run_in_background(
+                    refresh_query(cache, query_data, cache_key, json_output)
+                )
+
+    elif not params.cache.single_flight:
         log.debug("No existing cache entry for query {}", cache_key)
         log.debug(
             "Created new cache key {} entry for query {}", cache_key, query_data.summary
         )
 
-        timestamp = query_data.timestamp
-
-        starttime = time.time()
-
-        if params.fake_output:
-            # Return fake, static data for development purposes, if enabled.
-            cache_output = await fake_output(json_output)
-        else:
-            # Pass request to execution module
-            cache_output = await execute(query_data)
+        entry, runtime = await run_query(
+            cache, query_data, cache_key, json_output, executor
+        )
 
-        endtime = time.time()
-        elapsedtime = round(endtime - starttime, 4)
-        log.debug("Query {} took {} seconds to run.", cache_key, elapsedtime)
+    elif await cache.lease(
+        f"{SINGLE_FLIGHT_LEASE}.{cache_key}", seconds=params.request_timeout
+    ):
+        log.debug("No existing cache entry for query {}", cache_key)
+        log.debug(
+            "Created new cache key {} entry for query {}", cache_key, query_data.summary
+        )
 
-        if cache_output is None:
-            raise HyperglassError(message=params.messages.general, alert="danger")
+        entry, runtime = await lead_query(
+            cache, query_data, cache_key, json_output, executor
+        )
 
-        # Create a cache entry
-        if json_output:
-            raw_output = json.dumps(cache_output)
-        else:
-            raw_output = str(cache_output)
-        await cache.set_dict(cache_key, "output", raw_output)
-        await cache.set_dict(cache_key, "timestamp", timestamp)
-        await cache.expire(cache_key, seconds=cache_timeout)
+    else:
+        # An identical query is already being executed by another
+        # worker, so its result is shared rather than opening another
+        # session to the device.
+        entry = await follow_query(cache, cache_key)
 
-        log.debug("Added cache entry for query: {}", cache_key)
+        cached = True
+        runtime = 0
 
-        runtime = int(round(elapsedtime, 0))
+        if not entry:
+            # The shared output may have expired or been invalidated
+            # before it was read, in which case the query is run again.
+            log.debug("Cache entry for query {} is no longer cached", cache_key)
+            entry, runtime = await run_query(
+                cache, query_data, cache_key, json_output, executor
+            )
+            cached = False
 
-    # If it does, return the cached entry
-    cache_response = await cache.get_dict(cache_key, "output")
+    cache_response = entry.get("output")
     response_format = "text/plain"
 
     if json_output:
@@ -163,8 +353,9 @@ async def query(query_data: Query, request: Request, background_tasks: Backgroun
         "output": cache_response,
         "id": cache_key,
         "cached": cached,
+        "stale": stale,
         "runtime": runtime,
-        "timestamp": timestamp,
+        "timestamp": entry.get("timestamp"),
         "format": response_format,
         "random": query_data.random(),
         "level": "success",
@@ -172,6 +363,190 @@ async def query(query_data: Query, request: Request, background_tasks: Backgroun
     }
 
 
+async def query(query_data: Query, request: Request, background_tasks: BackgroundTasks):
+    """Ingest request data pass it to the backend application to perform the query."""
+
+    timestamp = datetime.utcnow()
+    background_tasks.add_task(send_webhook, query_data, request, timestamp)
+
+    cache = use_cache()
+
+    return await process_query(cache, query_data)
+
+
+@lru_cache(maxsize=None)
+def batch_limit() -> asyncio.Semaphore:
+    """Get the semaphore limiting concurrent batch sub-queries in this worker."""
+    return asyncio.Semaphore(params.batch.max_concurrent)
+
+
+async def batch_result(cache: AsyncCache, location: str, query_data: Query) -> Dict:
+    """Get a single location's batch result, including any error."""
+
+    try:
+        async with batch_limit():
+            result = await process_query(cache, query_data)
+
+    except HyperglassError as err:
+        result = {"output": err.message, "level": err.level, "keywords": err.keywords}
+
+    except Exception as err:
+        log.error("Error querying {}: {}", location, str(err))
+        result = {"output": params.messages.general, "level": "danger", "keywords": []}
+
+    return {"query_location": location, **result}
+
+
+async def batch(
+    batch_data: BatchQuery, request: Request, background_tasks: BackgroundTasks
+):
+    """Query many locations at once, streaming each result as it completes."""
+
+    timestamp = datetime.utcnow()
+
+    cache = use_cache()
+
+    batch_queries = []
+    errors = []
+
+    for location in batch_data.locations:
+        try:
+            query_data = batch_data.query(location)
+        except HyperglassError as err:
+            # The target may be valid for some locations but not others,
+            # e.g. if it is not allowed in a location's VRF.
+            errors.append(
+                {
+                    "query_location": location,
+                    "output": err.message,
+                    "level": err.level,
+                    "keywords": err.keywords,
+                }
+            )
+            continue
+
+        background_tasks.add_task(send_webhook, query_data, request, timestamp)
+        batch_queries.append((location, query_data))
+
+    log.info("Starting batch query execution for {} locations", len(batch_queries))
+
+    async def stream():
+        for error in errors:
+            yield json.dumps(error) + "\n"
+
+        tasks = [
+            asyncio.ensure_future(batch_result(cache, location, query_data))
+            for location, query_data in batch_queries
+        ]
+        try:
+            for result in asyncio.as_completed(tasks):
+                yield json.dumps(await result, default=str) + "\n"
+        finally:
+            # Stop any remaining queries if the client disconnects.
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+
+def server_sent_event(event: str, data: str) -> str:
+    """Format a Server-Sent Event."""
+    lines = "".join(f"data: {line}\n" for line in data.splitlines() or ("",))
+    return f"event: {event}\n{lines}\n"
+
+
+async def stream_query(
+    query_data: Query, request: Request, background_tasks: BackgroundTasks
+):
+    """Stream a query's output as Server-Sent Events, as the device produces it."""
+
+    if query_data.query_type not in STREAMED_QUERY_TYPES:
+        raise HTTPException(
+            detail=f"Query type '{query_data.query_type}' cannot be streamed",
+            status_code=400,
+        )
+
+    timestamp = datetime.utcnow()
+    background_tasks.add_task(send_webhook, query_data, request, timestamp)
+
+    cache = use_cache()
+
+    lines = asyncio.Queue()
+
+    async def executor(streamed: Query) -> Union[str, Sequence[Dict]]:
+        return await execute_stream(streamed, lines.put_nowait)
+
+    # The query runs to completion even if the client disconnects, so its
+    # output is still cached (and shared with any waiting followers).
+    task = asyncio.ensure_future(process_query(cache, query_data, executor))
+    task.add_done_callback(lambda _: lines.put_nowait(None))
+
+    async def events():
+        while True:
+            line = await lines.get()
+            if line is None:
+                break
+            yield server_sent_event("line", line)
+
+        try:
+            result = task.result()
+            yield server_sent_event("done", json.dumps(result, default=str))
+
+        except HyperglassError as err:
+            error = {
+                "output": err.message,
+                "level": err.level,
+                "keywords": err.keywords,
+            }
+            yield server_sent_event("error", json.dumps(error))
+
+        except Exception as err:
+            log.error("Error streaming query {}: {}", query_data.summary, str(err))
+            error = {
+                "output": params.messages.general,
+                "level": "danger",
+                "keywords": [],
+            }
+            yield server_sent_event("error", json.dumps(error))
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Prevent reverse proxies from buffering the stream.
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+async def invalidate_cache(
+    device: Optional[str] = None,
+    query_type: Optional[str] = None,
+    x_api_key: Optional[str] = Header(None),
+):
+    """Clear cached query output, optionally only a device's or query type's."""
+
+    api_key = params.cache.invalidation.api_key.get_secret_value()
+
+    if x_api_key is None or not secrets.compare_digest(x_api_key, api_key):
+        raise HTTPException(detail="Invalid API key", status_code=401)
+
+    if device is not None:
+        try:
+            device = devices[device]._id
+        except AttributeError:
+            raise HTTPException(detail=f"Device {device} not found", status_code=404)
+
+    if query_type is not None and query_type not in SUPPORTED_QUERY_TYPES:
+        raise HTTPException(
+            detail=f"Query type '{query_type}' is not supported", status_code=400
+        )
+
+    pattern = cache_namespace(device=device or "*", query_type=query_type or "*")
+    deleted = await use_cache().delete_matching(pattern)
+
+    log.info("Cleared {} cache entries matching {}", deleted, pattern)
+    return {"deleted": deleted}
+
+
 async def import_certificate(encoded_request: EncodedRequest):
     """Import a certificate from hyperglass-agent."""
 
@@ -205,6 +580,9 @@ async def import_certificate(encoded_request: EncodedRequest):
     except RuntimeError as err:
         raise HyperglassError(str(err), level="danger")
 
+    # Stop using the device's previous certificate.
+    AGENT_CLIENTS.evict(matched_device.name)
+
     log.info("Added public key for {}", encoded_request.device)
     return {
         "output": f"Added public key for {encoded_request.device}",
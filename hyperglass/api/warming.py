@@ -0,0 +1,126 @@
+"""Keep popular & configured queries cached."""
+
+# Standard Library
+import time
+import asyncio
+from typing import Dict, List, Hashable, Optional
+
+# Project
+from hyperglass.log import log
+from hyperglass.cache import AsyncCache
+from hyperglass.api.routes import SINGLE_FLIGHT_LEASE, lead_query, structured_output
+from hyperglass.models.api import Query
+from hyperglass.configuration import params
+from hyperglass.api.popularity import popular_queries
+
+WARMING_LEASE = "hyperglass.warming.lease"
+
+
+class CacheWarmer:
+    """Run popular & configured queries on an interval, so they are always cached.
+
+    Every worker runs the warmer, but only the worker holding the
+    warming lease runs queries on each interval. Queries are only run if
+    their cached output will not be fresh until the next interval, and
+    concurrent queries are limited per device.
+    """
+
+    def __init__(self, interval: int, popular: int, max_per_device: int) -> None:
+        """Initialize the warmer."""
+        self.interval = interval
+        self.popular = popular
+        self.max_per_device = max_per_device
+        self._limits: Dict[Hashable, asyncio.Semaphore] = {}
+        self._runner: Optional[asyncio.Future] = None
+
+    def __repr__(self) -> str:
+        """Represent warmer state."""
+        return "CacheWarmer(interval={}, popular={}, max_per_device={})".format(
+            self.interval, self.popular, self.max_per_device
+        )
+
+    def start(self, cache: AsyncCache) -> None:
+        """Start running queries on the interval."""
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.ensure_future(self._run(cache))
+
+    def stop(self) -> None:
+        """Stop running queries."""
+        if self._runner is not None:
+            self._runner.cancel()
+
+    def limit(self, key: Hashable) -> asyncio.Semaphore:
+        """Get the semaphore limiting concurrent queries for a device."""
+        if key not in self._limits:
+            self._limits[key] = asyncio.Semaphore(self.max_per_device)
+        return self._limits[key]
+
+    async def queries(self, cache: AsyncCache) -> List[Query]:
+        """Get each configured & popular query, without duplicates."""
+        configured = [
+            {
+                "query_location": q.query_location,
+                "query_type": q.query_type,
+                "query_vrf": q.query_vrf or "__hyperglass_default",
+                "query_target": q.query_target,
+            }
+            for q in params.cache.warming.queries
+        ]
+        popular = await popular_queries(cache, self.popular)
+
+        queries = {}
+        for spec in configured + popular:
+            try:
+                query_data = Query(**spec)
+            except Exception as err:
+                log.warning("Not warming invalid query {}: {}", spec, str(err))
+                continue
+            queries.setdefault(query_data.cache_key(), query_data)
+
+        return list(queries.values())
+
+    async def warm(self, cache: AsyncCache) -> None:
+        """Run each query whose output will not be fresh until the next interval."""
+        queries = await self.queries(cache)
+        log.debug("Warming cache with {} queries", len(queries))
+        await asyncio.gather(*(self.warm_query(cache, q) for q in queries))
+
+    async def warm_query(self, cache: AsyncCache, query_data: Query) -> None:
+        """Run a query & cache its output, unless it is fresh or already running."""
+        cache_key = query_data.cache_key()
+        entry = await cache.get_entry(cache_key)
+
+        if entry and entry.get("fresh_until", 0) > time.time() + self.interval:
+            return
+
+        async with self.limit(query_data.device._id):
+            if not await cache.lease(
+                f"{SINGLE_FLIGHT_LEASE}.{cache_key}", seconds=params.request_timeout
+            ):
+                return
+
+            log.debug("Warming cache for query {}", query_data.summary)
+
+            try:
+                await lead_query(
+                    cache, query_data, cache_key, structured_output(query_data)
+                )
+            except Exception as err:
+                log.error("Error warming query {}: {}", query_data.summary, str(err))
+
+    async def _run(self, cache: AsyncCache) -> None:
+        while True:
+            try:
+                if await cache.lease(WARMING_LEASE, seconds=self.interval):
+                    await self.warm(cache)
+            except Exception as err:
+                log.error("Error warming cache: {}", str(err))
+
+            await asyncio.sleep(self.interval)
+
+
+WARMER = CacheWarmer(
+    interval=params.cache.warming.interval,
+    popular=params.cache.warming.popular,
+    max_per_device=params.cache.warming.max_per_device,
+)
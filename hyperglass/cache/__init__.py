@@ -1,7 +1,65 @@
 """Redis cache handlers."""
 
+# Standard Library
+from typing import Optional
+from functools import lru_cache
+
 # Project
 from hyperglass.cache.aio import AsyncCache
+from hyperglass.cache.lru import LRUCache
 from hyperglass.cache.sync import SyncCache
+from hyperglass.cache.codec import Compressor
+
+__all__ = (
+    "AsyncCache",
+    "SyncCache",
+    "Compressor",
+    "LRUCache",
+    "use_cache",
+    "use_compressor",
+    "use_local_cache",
+)
+
+
+@lru_cache(maxsize=None)
+def use_local_cache() -> Optional[LRUCache]:
+    """Get this worker's local cache tier, if enabled."""
+    # Project
+    from hyperglass.configuration import params
+
+    if not params.cache.local.enable:
+        return None
+
+    return LRUCache(
+        max_entries=params.cache.local.max_entries, ttl=params.cache.local.ttl
+    )
+
+
+@lru_cache(maxsize=None)
+def use_compressor() -> Optional[Compressor]:
+    """Get this worker's compressor for large cache values, if enabled."""
+    # Project
+    from hyperglass.configuration import params
+
+    if not params.cache.compression.enable:
+        return None
+
+    return Compressor(
+        algorithm=params.cache.compression.algorithm,
+        min_size=params.cache.compression.min_size,
+        level=params.cache.compression.level,
+    )
+
+
+@lru_cache(maxsize=None)
+def use_cache() -> AsyncCache:
+    """Get this worker's shared cache handler & its Redis connection pool."""
+    # Project
+    from hyperglass.configuration import REDIS_CONFIG, params
 
-__all__ = ("AsyncCache", "SyncCache")
+    return AsyncCache(
+        db=params.cache.database,
+        local=use_local_cache(),
+        compressor=use_compressor(),
+        **REDIS_CONFIG,
+    )
@@ -1,11 +1,12 @@
 """Asyncio Redis cache handler."""
 
 # Standard Library
-import json
 import time
 import pickle
 import asyncio
-from typing import Any, Dict
+import fnmatch
+import secrets
+from typing import Any, Dict, List, Optional, Sequence
 
 # Third Party
 from aredis import StrictRedis as AsyncRedis
@@ -13,8 +14,12 @@ from aredis.pubsub import PubSub as AsyncPubSub
 from aredis.exceptions import RedisError
 
 # Project
-from hyperglass.cache.base import BaseCache
+from hyperglass.log import log
+from hyperglass.cache.lru import INVALIDATION_CHANNEL
+from hyperglass.cache.base import SCAN_COUNT, BaseCache
 from hyperglass.exceptions import HyperglassError
+from hyperglass.cache.codec import COMPRESSED_HEADER
+from hyperglass.cache.local import AsyncLocalRedis, local_store
 
 
 class AsyncCache(BaseCache):
@@ -28,14 +33,17 @@ class AsyncCache(BaseCache):
         if password is not None:
             password = password.get_secret_value()
 
-        self.instance: AsyncRedis = AsyncRedis(
-            db=self.db,
-            host=self.host,
-            port=self.port,
-            password=password,
-            decode_responses=self.decode_responses,
-            **self.redis_args,
-        )
+        if self.backend == "redis":
+            self.instance: AsyncRedis = AsyncRedis(
+                db=self.db,
+                host=self.host,
+                port=self.port,
+                password=password,
+                **self.redis_args,
+            )
+        else:
+            self.instance = AsyncLocalRedis(local_store(self.path), self.db, RedisError)
+        self._watcher: Optional[asyncio.Future] = None
 
     async def test(self):
         """Send an echo to Redis to ensure it can be reached."""
@@ -64,41 +72,120 @@ class AsyncCache(BaseCache):
                     level="danger",
                 ) from None
 
+    async def encode_async(self, *values: Any) -> List[bytes]:
+        """Encode values, compressing large values in a thread.
+
+        Compressing multi-megabyte output would otherwise block every
+        other request handled by this worker.
+        """
+        encoded = [self.serialize(v) for v in values]
+        compressor = self.compressor
+
+        if compressor is None or all(len(e) < compressor.min_size for e in encoded):
+            return encoded
+
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(
+            None, lambda: [compressor.compress(e) for e in encoded]
+        )
+
+    async def decode_async(self, values: Sequence[Optional[bytes]]) -> List[Any]:
+        """Decode values, decompressing compressed values in a thread."""
+        if any(v is not None and v[:1] == COMPRESSED_HEADER for v in values):
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(None, self.decode_many, values)
+
+        return self.decode_many(values)
+
+    async def decode_dict_async(self, value: Dict[bytes, bytes]) -> Dict[str, Any]:
+        """Decode each value of a hash map (dict), decompressing in a thread."""
+        decoded = await self.decode_async(list(value.values()))
+        return {k.decode("utf-8"): v for k, v in zip(value, decoded)}
+
     async def get(self, *args: str) -> Any:
         """Get item(s) from cache."""
         if len(args) == 1:
             raw = await self.instance.get(args[0])
-        else:
-            raw = await self.instance.mget(args)
-        return self.parse_types(raw)
+            return (await self.decode_async([raw]))[0]
+
+        raw = await self.instance.mget(args)
+        return await self.decode_async(raw)
 
     async def get_dict(self, key: str, field: str = "") -> Any:
         """Get hash map (dict) item(s)."""
-        if not field:
-            raw = await self.instance.hgetall(key)
-        else:
-            raw = await self.instance.hget(key, field)
+        field = str(field) or None
+        cached, generation = self.local_get(key, field)
 
-        return self.parse_types(raw)
+        if cached is not None:
+            return cached
 
-    async def set(self, key: str, value: str) -> bool:
+        if field is None:
+            value = await self.decode_dict_async(await self.instance.hgetall(key))
+        else:
+            raw = await self.instance.hget(key, field)
+            value = (await self.decode_async([raw]))[0]
+
+        self.local_put(key, value, field, generation)
+        return value
+
+    async def get_entry(self, key: str, seconds: Optional[int] = None) -> Dict:
+        """Get a hash map (dict) & reset its timeout in one round trip."""
+        cached, generation = self.local_get(key)
+
+        if cached is not None:
+            return cached
+
+        pipeline = await self.instance.pipeline(transaction=True)
+        await pipeline.hgetall(key)
+        if seconds is not None:
+            await pipeline.expire(key, seconds)
+        raw, *_ = await pipeline.execute()
+        value = await self.decode_dict_async(raw)
+
+        self.local_put(key, value, generation=generation)
+        return value
+
+    async def set_entry(self, key: str, mapping: Dict, seconds: int) -> None:
+        """Set a hash map (dict) & its timeout in one round trip."""
+        encoded = await self.encode_async(*mapping.values())
+        pipeline = await self.instance.pipeline(transaction=True)
+        await pipeline.delete(key)
+        await pipeline.hmset(key, dict(zip(mapping, encoded)))
+        await pipeline.expire(key, seconds)
+        await pipeline.execute()
+        await self.invalidate(key)
+
+    async def set(self, key: str, value: Any) -> bool:
         """Set cache values."""
-        return await self.instance.set(key, value)
-
-    async def set_dict(self, key: str, field: str, value: str) -> bool:
+        encoded = await self.encode_async(value)
+        return await self.instance.set(key, encoded[0])
+
+    async def get_many(self, keys: Sequence[str]) -> List[Any]:
+        """Get multiple items from cache in one round trip, in the order of keys."""
+        if not keys:
+            return []
+        return await self.decode_async(await self.instance.mget(keys))
+
+    async def set_many(self, mapping: Dict[str, Any], seconds: int) -> None:
+        """Set multiple cache values, each with its own timeout, in one round trip."""
+        encoded = await self.encode_async(*mapping.values())
+        pipeline = await self.instance.pipeline(transaction=True)
+        for key, value in zip(mapping, encoded):
+            await pipeline.set(key, value, ex=seconds)
+        await pipeline.execute()
+
+    async def set_dict(self, key: str, field: str, value: Any) -> bool:
         """Set hash map (dict) values."""
         success = False
 
-        if isinstance(value, Dict):
-            value = json.dumps(value)
-        else:
-            value = str(value)
-
-        response = await self.instance.hset(key, field, value)
+        encoded = await self.encode_async(value)
+        response = await self.instance.hset(key, field, encoded[0])
 
         if response in (0, 1):
             success = True
 
+        await self.invalidate(key, field)
+
         return success
 
     async def wait(self, pubsub: AsyncPubSub, timeout: int = 30, **kwargs) -> Any:
@@ -108,11 +195,16 @@ class AsyncCache(BaseCache):
 
         while now < timeout:
 
+            if self.backend != "redis":
+                # Local subscribers are woken when a message is published,
+                # so wait for one rather than polling.
+                kwargs["timeout"] = timeout - now
+
             message = await pubsub.get_message(ignore_subscribe_messages=True, **kwargs)
 
             if message is not None and message["type"] == "message":
                 data = message["data"]
-                return self.parse_types(data)
+                return self.decode(data)
 
             await asyncio.sleep(0.01)
             now = time.time()
@@ -123,18 +215,117 @@ class AsyncCache(BaseCache):
         """Provide an aredis.pubsub.Pubsub instance."""
         return self.instance.pubsub()
 
-    async def pub(self, key: str, value: str) -> None:
+    async def pub(self, key: str, value: Any, delay: float = 1) -> None:
         """Publish a value."""
-        await asyncio.sleep(1)
-        await self.instance.publish(key, value)
+        await asyncio.sleep(delay)
+        await self.instance.publish(key, self.encode(value))
+
+    async def invalidate(self, key: Optional[str], field: Optional[str] = None) -> None:
+        """Evict a written key from every worker's local tier."""
+        if self.local is None:
+            return
+
+        if key is None:
+            self.local.clear()
+        else:
+            self.local.evict(key, field)
+
+        await self.instance.publish(INVALIDATION_CHANNEL, self.encode([key, field]))
+
+    def watch(self) -> None:
+        """Evict keys written by other workers from the local tier."""
+        if self.local is not None and (self._watcher is None or self._watcher.done()):
+            self._watcher = asyncio.ensure_future(self._watch())
+
+    def unwatch(self) -> None:
+        """Stop evicting keys written by other workers."""
+        if self._watcher is not None:
+            self._watcher.cancel()
+
+    async def _watch(self) -> None:
+        while True:
+            pubsub = self.instance.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                while True:
+                    message = await pubsub.get_message(
+                        ignore_subscribe_messages=True, timeout=1
+                    )
+                    if message is not None and message["type"] == "message":
+                        self.evicted(message["data"])
+
+            except RedisError as err:
+                # Writes may be missed while disconnected, so nothing
+                # held locally can be trusted.
+                log.error("Local cache invalidation failed: {}", str(err))
+                self.local.clear()
+                await asyncio.sleep(1)
+
+            finally:
+                pubsub.close()
+
+    async def count(self, key: str, member: str, seconds: int, amount: int = 1) -> None:
+        """Increment a member's count in a sorted set & set the set's timeout."""
+        pipeline = await self.instance.pipeline(transaction=True)
+        await pipeline.zincrby(key, member, amount)
+        await pipeline.expire(key, seconds)
+        await pipeline.execute()
+
+    async def counts(self, keys: Sequence[str], member: str) -> float:
+        """Get the sum of a member's counts in one or more sorted sets."""
+        pipeline = await self.instance.pipeline(transaction=True)
+        for key in keys:
+            await pipeline.zscore(key, member)
+        scores = await pipeline.execute()
+        return sum(s for s in scores if s is not None)
+
+    async def top(self, keys: Sequence[str], count: int) -> List[str]:
+        """Get the members with the highest total counts in one or more sorted sets."""
+        union = "{}.{}".format(keys[0], secrets.token_hex(8))
+        pipeline = await self.instance.pipeline(transaction=True)
+        await pipeline.zunionstore(union, keys)
+        await pipeline.zrevrange(union, 0, count - 1)
+        await pipeline.delete(union)
+        _, members, _ = await pipeline.execute()
+        return [m.decode("utf-8") for m in members]
+
+    async def lease(self, key: str, seconds: int) -> bool:
+        """Acquire an expiring lease on a key, only if it is not already held."""
+        acquired = await self.instance.set(key, "1", ex=seconds, nx=True)
+        return bool(acquired)
 
     async def clear(self) -> None:
         """Clear the cache."""
         await self.instance.flushdb()
+        await self.invalidate(None)
 
     async def delete(self, *keys: str) -> None:
         """Delete a cache key."""
         await self.instance.delete(*keys)
+        for key in keys:
+            await self.invalidate(key)
+
+    async def delete_matching(self, pattern: str, keep: Optional[str] = None) -> int:
+        """Delete all keys matching a pattern, except keys matching keep."""
+        deleted = 0
+        keys = []
+
+        async for key in self.instance.scan_iter(match=pattern, count=SCAN_COUNT):
+            key = key.decode("utf-8")
+            if keep is None or not fnmatch.fnmatchcase(key, keep):
+                keys.append(key)
+
+            if len(keys) == SCAN_COUNT:
+                deleted += await self.instance.delete(*keys)
+                keys = []
+
+        if keys:
+            deleted += await self.instance.delete(*keys)
+
+        if deleted:
+            await self.invalidate(None)
+
+        return deleted
 
     async def expire(self, *keys: str, seconds: int) -> None:
         """Set timeout of key in seconds."""
@@ -144,5 +335,5 @@ class AsyncCache(BaseCache):
     async def get_config(self) -> Dict:
         """Get picked config object from cache."""
 
-        pickled = await self.instance.get("HYPERGLASS_CONFIG")
+        pickled = await self.get("HYPERGLASS_CONFIG")
         return pickle.loads(pickled)
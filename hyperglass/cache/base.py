@@ -1,13 +1,43 @@
 """Base Redis cache handler."""
 
 # Standard Library
-import re
 import json
-from typing import Any, Optional
+from typing import Any, Dict, List, Tuple, Union, Optional
 
 # Third Party
 from pydantic import SecretStr
 
+# Project
+from hyperglass.cache.lru import LRUCache
+from hyperglass.cache.codec import COMPRESSED_HEADER, Compressor, decompress
+
+# Version of the format values are stored in. Each value is stored as
+# the format version & a type tag, followed by the value's encoding.
+FORMAT_VERSION = 1
+
+TAG_STR = b"s"
+TAG_BYTES = b"b"
+TAG_INT = b"i"
+TAG_FLOAT = b"f"
+TAG_BOOL = b"?"
+TAG_NONE = b"n"
+TAG_JSON = b"j"
+
+HEADER = bytes((FORMAT_VERSION,))
+
+# Number of keys scanned & deleted at a time when deleting by pattern.
+SCAN_COUNT = 500
+
+DECODERS = {
+    TAG_STR: lambda v: v.decode("utf-8"),
+    TAG_BYTES: lambda v: v,
+    TAG_INT: int,
+    TAG_FLOAT: float,
+    TAG_BOOL: lambda v: v == b"1",
+    TAG_NONE: lambda v: None,
+    TAG_JSON: json.loads,
+}
+
 
 class BaseCache:
     """Redis cache handler."""
@@ -18,49 +48,106 @@ class BaseCache:
         host: str = "localhost",
         port: int = 6379,
         password: Optional[SecretStr] = None,
-        decode_responses: bool = True,
+        local: Optional[LRUCache] = None,
+        compressor: Optional[Compressor] = None,
+        backend: str = "redis",
+        path: Optional[str] = None,
         **kwargs: Any,
     ) -> None:
         """Initialize Redis connection."""
         self.db: int = db
+        self.backend: str = backend
+        self.path: str = ":memory:" if path is None else str(path)
         self.host: str = str(host)
         self.port: int = port
         self.password: Optional[SecretStr] = password
-        self.decode_responses: bool = decode_responses
+        self.local: Optional[LRUCache] = local
+        self.compressor: Optional[Compressor] = compressor
         self.redis_args: dict = kwargs
 
     def __repr__(self) -> str:
         """Represent class state."""
+        if self.backend != "redis":
+            return "HyperglassCache(db={}, backend={}, path={})".format(
+                self.db, self.backend, self.path
+            )
         return "HyperglassCache(db={}, host={}, port={}, password={})".format(
             self.db, self.host, self.port, self.password
         )
 
-    def parse_types(self, value: str) -> Any:
-        """Parse a string to standard python types."""
+    def encode(self, value: Any) -> bytes:
+        """Encode a value with its type, so it is decoded as the same type."""
+        encoded = self.serialize(value)
 
-        def parse_string(str_value: str):
+        if self.compressor is not None:
+            return self.compressor.compress(encoded)
 
-            is_float = (re.compile(r"^(\d+\.\d+)$"), float)
-            is_int = (re.compile(r"^(\d+)$"), int)
-            is_bool = (re.compile(r"^(True|true|False|false)$"), bool)
-            is_none = (re.compile(r"^(None|none|null|nil|\(nil\))$"), lambda v: None)
-            is_jsonable = (re.compile(r"^[\{\[].*[\}\]]$"), json.loads)
+        return encoded
 
-            for pattern, factory in (is_float, is_int, is_bool, is_none, is_jsonable):
-                if isinstance(str_value, str) and bool(re.match(pattern, str_value)):
-                    str_value = factory(str_value)
-                    break
-            return str_value
+    def serialize(self, value: Any) -> bytes:
+        """Encode a value with its type, without compressing it."""
 
         if isinstance(value, str):
-            value = parse_string(value)
+            tag, encoded = TAG_STR, value.encode("utf-8")
         elif isinstance(value, bytes):
-            value = parse_string(value.decode("utf-8"))
-        elif isinstance(value, list):
-            value = [parse_string(i) for i in value]
-        elif isinstance(value, tuple):
-            value = tuple(parse_string(i) for i in value)
-        elif isinstance(value, dict):
-            value = {k: self.parse_types(v) for k, v in value.items()}
-
-        return value
+            tag, encoded = TAG_BYTES, value
+        elif isinstance(value, bool):
+            tag, encoded = TAG_BOOL, b"1" if value else b"0"
+        elif isinstance(value, int):
+            tag, encoded = TAG_INT, str(value).encode()
+        elif isinstance(value, float):
+            tag, encoded = TAG_FLOAT, repr(value).encode()
+        elif value is None:
+            tag, encoded = TAG_NONE, b""
+        else:
+            tag, encoded = TAG_JSON, json.dumps(value).encode("utf-8")
+
+        return HEADER + tag + encoded
+
+    def decode(self, value: Optional[bytes]) -> Any:
+        """Decode a value encoded (& possibly compressed) by encode().
+
+        Values not encoded by encode(), e.g. by a previous version of
+        hyperglass, are returned as strings.
+        """
+        if value is None:
+            return None
+
+        if value[:1] == COMPRESSED_HEADER:
+            value = decompress(value)
+
+        decoder = DECODERS.get(value[1:2])
+
+        if value[:1] != HEADER or decoder is None:
+            return value.decode("utf-8", errors="replace")
+
+        return decoder(value[2:])
+
+    def decode_dict(self, value: Dict[bytes, bytes]) -> Dict[str, Any]:
+        """Decode each value of a hash map (dict)."""
+        return {k.decode("utf-8"): self.decode(v) for k, v in value.items()}
+
+    def decode_many(self, values: Union[List, tuple]) -> List[Any]:
+        """Decode multiple values."""
+        return [self.decode(v) for v in values]
+
+    def local_get(self, key: str, field: Optional[str] = None) -> Tuple[Any, int]:
+        """Get a value from the local tier, & the generation it was read at."""
+        if self.local is None:
+            return None, -1
+        return self.local.get(key, field), self.local.generation
+
+    def local_put(
+        self, key: str, value: Any, field: Optional[str] = None, generation: int = -1
+    ) -> None:
+        """Add a value read from Redis to the local tier."""
+        if self.local is not None:
+            self.local.put(key, value, field, generation)
+
+    def evicted(self, message: bytes) -> None:
+        """Evict a key announced on the invalidation channel from the local tier."""
+        key, field = self.decode(message)
+        if key is None:
+            self.local.clear()
+        else:
+            self.local.evict(key, field)
@@ -0,0 +1,123 @@
+"""Compression of large cache values."""
+
+# Standard Library
+import lzma
+import zlib
+import threading
+from typing import Dict, Tuple, Callable, Optional
+
+# Project
+from hyperglass.log import log
+
+# Compressed values are stored as this format version & the codec's ID,
+# followed by the compressed value.
+COMPRESSED_FORMAT_VERSION = 2
+
+COMPRESSED_HEADER = bytes((COMPRESSED_FORMAT_VERSION,))
+
+Compress = Callable[[bytes, Optional[int]], bytes]
+Decompress = Callable[[bytes], bytes]
+
+
+def _zlib_compress(value: bytes, level: Optional[int]) -> bytes:
+    return zlib.compress(value, -1 if level is None else level)
+
+
+def _lzma_compress(value: bytes, level: Optional[int]) -> bytes:
+    return lzma.compress(value, preset=level)
+
+
+def _zstd_compress(value: bytes, level: Optional[int]) -> bytes:
+    # Third Party
+    import zstandard
+
+    return zstandard.ZstdCompressor(level=3 if level is None else level).compress(value)
+
+
+def _zstd_decompress(value: bytes) -> bytes:
+    # Third Party
+    import zstandard
+
+    return zstandard.ZstdDecompressor().decompress(value)
+
+
+CODECS: Dict[str, Tuple[bytes, Compress, Decompress]] = {
+    "zlib": (b"z", _zlib_compress, zlib.decompress),
+    "lzma": (b"x", _lzma_compress, lzma.decompress),
+    "zstd": (b"Z", _zstd_compress, _zstd_decompress),
+}
+
+DECOMPRESSORS: Dict[bytes, Decompress] = {i: d for i, _, d in CODECS.values()}
+
+
+def decompress(value: bytes) -> bytes:
+    """Decompress a value compressed by Compressor, with any codec."""
+    decompressor = DECOMPRESSORS.get(value[1:2])
+
+    if decompressor is None:
+        raise ValueError(f"Unknown cache compression codec '{value[1:2]}'")
+
+    return decompressor(value[2:])
+
+
+class Compressor:
+    """Compress cache values larger than a minimum size.
+
+    Values are only stored compressed if compression makes them smaller.
+    Sizes before & after compression are counted, so the overall
+    compression ratio can be reported.
+    """
+
+    def __init__(self, algorithm: str, min_size: int, level: Optional[int]) -> None:
+        """Initialize the compressor."""
+        self.algorithm = algorithm
+        self.min_size = min_size
+        self.level = level
+        self._id, self._compress, _ = CODECS[algorithm]
+        self._lock = threading.Lock()
+        self._compressed = 0
+        self._original_bytes = 0
+        self._compressed_bytes = 0
+
+    def __repr__(self) -> str:
+        """Represent compressor state."""
+        return "Compressor(algorithm={}, {})".format(
+            self.algorithm, ", ".join(f"{k}={v}" for k, v in self.stats().items())
+        )
+
+    def stats(self) -> Dict[str, float]:
+        """Get the number of values compressed & the overall compression ratio."""
+        with self._lock:
+            ratio = 0.0
+            if self._compressed_bytes:
+                ratio = round(self._original_bytes / self._compressed_bytes, 2)
+            return {
+                "compressed": self._compressed,
+                "original_bytes": self._original_bytes,
+                "compressed_bytes": self._compressed_bytes,
+                "ratio": ratio,
+            }
+
+    def compress(self, value: bytes) -> bytes:
+        """Compress a value if it is large enough, & compression makes it smaller."""
+        if len(value) < self.min_size:
+            return value
+
+        compressed = COMPRESSED_HEADER + self._id + self._compress(value, self.level)
+
+        if len(compressed) >= len(value):
+            return value
+
+        with self._lock:
+            self._compressed += 1
+            self._original_bytes += len(value)
+            self._compressed_bytes += len(compressed)
+
+        log.debug(
+            "Compressed cache value from {} to {} bytes ({:.2f}x), {!r}",
+            len(value),
+            len(compressed),
+            len(value) / len(compressed),
+            self,
+        )
+        return compressed
@@ -0,0 +1,686 @@
+"""Local cache backend, for running hyperglass without a Redis server.
+
+Implements the subset of Redis commands used by the cache handlers on
+top of SQLite, either in memory (for a single hyperglass worker) or in
+a file shared by every worker.
+"""
+
+# Standard Library
+import os
+import time
+import asyncio
+import sqlite3
+import threading
+from typing import (
+    Any,
+    Set,
+    Dict,
+    List,
+    Type,
+    Tuple,
+    Union,
+    Callable,
+    Iterator,
+    Optional,
+    Sequence,
+    AsyncIterator,
+)
+from functools import partial, lru_cache
+from contextlib import contextmanager
+
+# Time in seconds published messages are kept for subscribers.
+MESSAGE_RETENTION = 60
+
+# Time in seconds between checks for messages published by other
+# processes while waiting. Subscribers in the publishing process are
+# woken as soon as a message is published.
+POLL_INTERVAL = 0.25
+
+# Time in seconds between deletions of expired keys that haven't been read.
+PURGE_INTERVAL = 60
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS keys (
+        db INTEGER, key TEXT, type TEXT, expires REAL, PRIMARY KEY (db, key)
+    )""",
+    """CREATE TABLE IF NOT EXISTS entries (
+        db INTEGER, key TEXT, field TEXT, value BLOB, score REAL,
+        PRIMARY KEY (db, key, field)
+    )""",
+    """CREATE TABLE IF NOT EXISTS messages (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, channel TEXT, data BLOB, created REAL
+    )""",
+)
+
+# Commands that only read, & so don't need to wait for other writers.
+READ_COMMANDS = {
+    "echo",
+    "get",
+    "mget",
+    "hget",
+    "hgetall",
+    "zscore",
+    "zrevrange",
+    "scan",
+    "last_message",
+    "messages",
+}
+
+Value = Union[str, bytes, int, float]
+
+
+def _bytes(value: Value) -> bytes:
+    if isinstance(value, bytes):
+        return value
+    return str(value).encode("utf-8")
+
+
+def _str(value: Value) -> str:
+    if isinstance(value, bytes):
+        return value.decode("utf-8")
+    return str(value)
+
+
+class LocalStore:
+    """SQLite database holding every local cache key.
+
+    A file database can be shared by multiple processes. Connections
+    are reopened after a fork, so a store opened before the hyperglass
+    workers are started can be used by each of them. Reads don't wait
+    for other processes' writes, and only writes delete expired keys.
+    """
+
+    def __init__(self, path: str) -> None:
+        """Initialize the store without connecting."""
+        self.path = path
+        self._lock = threading.RLock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._depth = 0
+        self._purged = time.time()
+        self._waiters: Set[Callable[[], None]] = set()
+
+    def __repr__(self) -> str:
+        """Represent store state."""
+        return f"LocalStore(path={self.path})"
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        """Get this process's connection to the database."""
+        if self._connection is None or self._pid != os.getpid():
+            self._connection = sqlite3.connect(
+                self.path, timeout=30, isolation_level=None, check_same_thread=False
+            )
+            self._pid = os.getpid()
+            if self.path != ":memory:":
+                self._connection.execute("PRAGMA journal_mode=WAL")
+            for statement in SCHEMA:
+                self._connection.execute(statement)
+        return self._connection
+
+    @contextmanager
+    def transaction(
+        self, error: Type[Exception], write: bool = True
+    ) -> Iterator[sqlite3.Connection]:
+        """Run statements in a single transaction, raising database errors as error.
+
+        Write transactions take the database's write lock immediately, &
+        delete expired keys on an interval. Read transactions only read
+        the last committed state, so never wait for a writer.
+        """
+        with self._lock:
+            connection = self.connection
+            outermost = self._depth == 0
+            self._depth += 1
+            try:
+                if outermost and write:
+                    connection.execute("BEGIN IMMEDIATE")
+                    self._purge(connection)
+                elif outermost:
+                    connection.execute("BEGIN")
+                yield connection
+                if outermost:
+                    connection.execute("COMMIT")
+            except sqlite3.Error as err:
+                if outermost:
+                    connection.execute("ROLLBACK")
+                raise error(str(err)) from err
+            except BaseException:
+                if outermost:
+                    connection.execute("ROLLBACK")
+                raise
+            finally:
+                self._depth -= 1
+
+    @contextmanager
+    def waiting(self, wake: Callable[[], None]) -> Iterator[None]:
+        """Call wake whenever a message is published by this process."""
+        self._waiters.add(wake)
+        try:
+            yield
+        finally:
+            self._waiters.discard(wake)
+
+    def notify(self) -> None:
+        """Wake every subscriber in this process waiting for a message."""
+        for wake in list(self._waiters):
+            wake()
+
+    def _purge(self, connection: sqlite3.Connection) -> None:
+        now = time.time()
+        if now - self._purged < PURGE_INTERVAL:
+            return
+
+        self._purged = now
+        connection.execute(
+            "DELETE FROM entries WHERE EXISTS (SELECT 1 FROM keys WHERE "
+            "keys.db = entries.db AND keys.key = entries.key AND keys.expires <= ?)",
+            (now,),
+        )
+        connection.execute("DELETE FROM keys WHERE expires <= ?", (now,))
+        connection.execute(
+            "DELETE FROM messages WHERE created < ?", (now - MESSAGE_RETENTION,)
+        )
+
+
+@lru_cache(maxsize=None)
+def local_store(path: str) -> LocalStore:
+    """Get the store for a path, shared by every cache handler in this process."""
+    return LocalStore(path)
+
+
+class LocalCommands:
+    """Redis commands used by the cache handlers, for one local database."""
+
+    def __init__(self, store: LocalStore, db: int, error: Type[Exception]) -> None:
+        """Initialize the commands."""
+        self.store = store
+        self.db = db
+        self.error = error
+
+    def __repr__(self) -> str:
+        """Represent client state."""
+        return f"{self.__class__.__name__}(path={self.store.path}, db={self.db})"
+
+    def transaction(self, write: bool = True):
+        """Run commands in a single transaction."""
+        return self.store.transaction(self.error, write)
+
+    def _type(self, conn: sqlite3.Connection, key: str) -> Optional[str]:
+        """Get the type of a key, or None if it doesn't exist or has expired."""
+        row = conn.execute(
+            "SELECT type, expires FROM keys WHERE db = ? AND key = ?", (self.db, key)
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        kind, expires = row
+        if expires is not None and expires <= time.time():
+            return None
+
+        return kind
+
+    def _delete(self, conn: sqlite3.Connection, key: str) -> None:
+        conn.execute("DELETE FROM keys WHERE db = ? AND key = ?", (self.db, key))
+        conn.execute("DELETE FROM entries WHERE db = ? AND key = ?", (self.db, key))
+
+    def _create(self, conn: sqlite3.Connection, key: str, kind: str) -> None:
+        """Create a key of a type, replacing it if it exists with another type."""
+        existing = self._type(conn, key)
+
+        if existing == kind:
+            return
+
+        # Delete the existing key, including an expired key not yet purged.
+        self._delete(conn, key)
+
+        conn.execute(
+            "INSERT INTO keys (db, key, type, expires) VALUES (?, ?, ?, NULL)",
+            (self.db, key, kind),
+        )
+
+    def _value(self, conn: sqlite3.Connection, key: str, field: str) -> Any:
+        row = conn.execute(
+            "SELECT value FROM entries WHERE db = ? AND key = ? AND field = ?",
+            (self.db, key, field),
+        ).fetchone()
+        return None if row is None else row[0]
+
+    def echo(self, value: Value) -> bytes:
+        """Return a value."""
+        return _bytes(value)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Get a string value."""
+        with self.transaction(write=False) as conn:
+            if self._type(conn, key) != "string":
+                return None
+            return self._value(conn, key, "")
+
+    def mget(self, keys: Sequence[str]) -> List[Optional[bytes]]:
+        """Get multiple string values."""
+        with self.transaction(write=False):
+            return [self.get(key) for key in keys]
+
+    def set(
+        self, key: str, value: Value, ex: Optional[int] = None, nx: bool = False
+    ) -> Optional[bool]:
+        """Set a string value, only if the key doesn't exist if nx is set."""
+        with self.transaction() as conn:
+            if nx and self._type(conn, key) is not None:
+                return None
+
+            self._delete(conn, key)
+            conn.execute(
+                "INSERT INTO keys (db, key, type, expires) VALUES (?, ?, ?, ?)",
+                (self.db, key, "string", None if ex is None else time.time() + ex),
+            )
+            conn.execute(
+                "INSERT INTO entries (db, key, field, value) VALUES (?, ?, '', ?)",
+                (self.db, key, _bytes(value)),
+            )
+            return True
+
+    def hget(self, key: str, field: Value) -> Optional[bytes]:
+        """Get a hash map field's value."""
+        with self.transaction(write=False) as conn:
+            if self._type(conn, key) != "hash":
+                return None
+            return self._value(conn, key, _str(field))
+
+    def hgetall(self, key: str) -> Dict[bytes, bytes]:
+        """Get every field & value of a hash map."""
+        with self.transaction(write=False) as conn:
+            if self._type(conn, key) != "hash":
+                return {}
+            rows = conn.execute(
+                "SELECT field, value FROM entries WHERE db = ? AND key = ?",
+                (self.db, key),
+            )
+            return {field.encode("utf-8"): value for field, value in rows}
+
+    def hset(
+        self,
+        key: str,
+        field: Optional[Value] = None,
+        value: Optional[Value] = None,
+        mapping: Optional[Dict] = None,
+    ) -> int:
+        """Set hash map fields, returning the number of fields added."""
+        items = dict(mapping or {})
+        if field is not None:
+            items[field] = value
+
+        added = 0
+        with self.transaction() as conn:
+            self._create(conn, key, "hash")
+            for name, item in items.items():
+                name = _str(name)
+                if self._value(conn, key, name) is None:
+                    added += 1
+                conn.execute(
+                    "INSERT OR REPLACE INTO entries (db, key, field, value) "
+                    "VALUES (?, ?, ?, ?)",
+                    (self.db, key, name, _bytes(item)),
+                )
+        return added
+
+    def hmset(self, key: str, mapping: Dict) -> bool:
+        """Set multiple hash map fields."""
+        self.hset(key, mapping=mapping)
+        return True
+
+    def delete(self, *keys: str) -> int:
+        """Delete keys, returning the number of keys that existed."""
+        deleted = 0
+        with self.transaction() as conn:
+            for key in keys:
+                if self._type(conn, key) is not None:
+                    deleted += 1
+                self._delete(conn, key)
+        return deleted
+
+    def expire(self, key: str, seconds: int) -> bool:
+        """Set a key's timeout in seconds."""
+        with self.transaction() as conn:
+            if self._type(conn, key) is None:
+                return False
+            conn.execute(
+                "UPDATE keys SET expires = ? WHERE db = ? AND key = ?",
+                (time.time() + seconds, self.db, key),
+            )
+            return True
+
+    def flushdb(self) -> bool:
+        """Delete every key."""
+        with self.transaction() as conn:
+            conn.execute("DELETE FROM keys WHERE db = ?", (self.db,))
+            conn.execute("DELETE FROM entries WHERE db = ?", (self.db,))
+        return True
+
+    def zincrby(self, key: str, member: Value, amount: float = 1) -> float:
+        """Increment a sorted set member's score."""
+        member = _str(member)
+        with self.transaction() as conn:
+            self._create(conn, key, "zset")
+            row = conn.execute(
+                "SELECT score FROM entries WHERE db = ? AND key = ? AND field = ?",
+                (self.db, key, member),
+            ).fetchone()
+            score = amount + (0 if row is None else row[0])
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (db, key, field, score) "
+                "VALUES (?, ?, ?, ?)",
+                (self.db, key, member, score),
+            )
+            return score
+
+    def zscore(self, key: str, member: Value) -> Optional[float]:
+        """Get a sorted set member's score."""
+        with self.transaction(write=False) as conn:
+            if self._type(conn, key) != "zset":
+                return None
+            row = conn.execute(
+                "SELECT score FROM entries WHERE db = ? AND key = ? AND field = ?",
+                (self.db, key, _str(member)),
+            ).fetchone()
+            return None if row is None else row[0]
+
+    def zunionstore(self, dest: str, keys: Sequence[str]) -> int:
+        """Store the sum of each member's scores in multiple sorted sets."""
+        scores: Dict[str, float] = {}
+        with self.transaction() as conn:
+            for key in keys:
+                if self._type(conn, key) != "zset":
+                    continue
+                rows = conn.execute(
+                    "SELECT field, score FROM entries WHERE db = ? AND key = ?",
+                    (self.db, key),
+                )
+                for member, score in rows:
+                    scores[member] = scores.get(member, 0) + score
+
+            self._delete(conn, dest)
+            if scores:
+                self._create(conn, dest, "zset")
+            conn.executemany(
+                "INSERT INTO entries (db, key, field, score) VALUES (?, ?, ?, ?)",
+                ((self.db, dest, m, score) for m, score in scores.items()),
+            )
+        return len(scores)
+
+    def zrevrange(self, key: str, start: int, end: int) -> List[bytes]:
+        """Get sorted set members by rank, from highest to lowest score."""
+        with self.transaction(write=False) as conn:
+            if self._type(conn, key) != "zset":
+                return []
+            rows = conn.execute(
+                "SELECT field FROM entries WHERE db = ? AND key = ? "
+                "ORDER BY score DESC, field DESC",
+                (self.db, key),
+            ).fetchall()
+
+        members = [m.encode("utf-8") for m, in rows]
+        return members[start:] if end == -1 else members[start : end + 1]
+
+    def scan(self, match: Optional[str] = None) -> List[bytes]:
+        """Get every key, or every key matching a glob-style pattern."""
+        with self.transaction(write=False) as conn:
+            rows = conn.execute(
+                "SELECT key, expires FROM keys WHERE db = ? AND key GLOB ?",
+                (self.db, match or "*"),
+            ).fetchall()
+
+        now = time.time()
+        return [k.encode("utf-8") for k, e in rows if e is None or e > now]
+
+    def publish(self, channel: str, message: Value) -> int:
+        """Publish a message to a channel."""
+        now = time.time()
+        with self.transaction() as conn:
+            conn.execute(
+                "INSERT INTO messages (channel, data, created) VALUES (?, ?, ?)",
+                (channel, _bytes(message), now),
+            )
+        self.store.notify()
+        return 1
+
+    def last_message(self) -> int:
+        """Get the ID of the most recently published message."""
+        with self.transaction(write=False) as conn:
+            row = conn.execute("SELECT MAX(id) FROM messages").fetchone()
+        return row[0] or 0
+
+    def messages(self, after: int, channels: Sequence[str]) -> List[Tuple]:
+        """Get messages published to channels since a message."""
+        if not channels:
+            return []
+
+        with self.transaction(write=False) as conn:
+            return conn.execute(
+                "SELECT id, channel, data FROM messages WHERE id > ? "
+                "AND channel IN ({}) ORDER BY id".format(",".join("?" * len(channels))),
+                (after, *channels),
+            ).fetchall()
+
+
+class LocalPubSub:
+    """Receive messages published to local channels, by polling the store."""
+
+    def __init__(self, commands: LocalCommands) -> None:
+        """Initialize the subscriber."""
+        self.commands = commands
+        self.channels: List[str] = []
+        self.last = 0
+        self.pending: List[Tuple] = []
+
+    def _subscribe(self, *channels: str) -> None:
+        if not self.channels:
+            self.last = self.commands.last_message()
+        self.channels += [_str(c) for c in channels if _str(c) not in self.channels]
+
+    def _unsubscribe(self, *channels: str) -> None:
+        if not channels:
+            self.channels = []
+        self.channels = [c for c in self.channels if c not in map(_str, channels)]
+
+    def _next(self) -> Optional[Dict]:
+        if not self.pending:
+            self.pending = self.commands.messages(self.last, self.channels)
+
+        if not self.pending:
+            return None
+
+        message_id, channel, data = self.pending.pop(0)
+        self.last = message_id
+        return {"type": "message", "channel": channel.encode("utf-8"), "data": data}
+
+    def close(self) -> None:
+        """Stop receiving messages."""
+        self._unsubscribe()
+
+
+class SyncLocalPubSub(LocalPubSub):
+    """Receive messages published to local channels."""
+
+    def subscribe(self, *channels: str) -> None:
+        """Subscribe to channels."""
+        self._subscribe(*channels)
+
+    def unsubscribe(self, *channels: str) -> None:
+        """Unsubscribe from channels, or all channels if none are passed."""
+        self._unsubscribe(*channels)
+
+    def get_message(
+        self, ignore_subscribe_messages: bool = False, timeout: float = 0
+    ) -> Optional[Dict]:
+        """Get the next message, waiting up to timeout seconds for one."""
+        deadline = time.time() + timeout
+        published = threading.Event()
+
+        with self.commands.store.waiting(published.set):
+            while True:
+                published.clear()
+                message = self._next()
+                remaining = deadline - time.time()
+                if message is not None or remaining <= 0:
+                    return message
+                published.wait(min(remaining, POLL_INTERVAL))
+
+
+class AsyncLocalPubSub(LocalPubSub):
+    """Receive messages published to local channels, without blocking."""
+
+    async def subscribe(self, *channels: str) -> None:
+        """Subscribe to channels."""
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, partial(self._subscribe, *channels))
+
+    async def unsubscribe(self, *channels: str) -> None:
+        """Unsubscribe from channels, or all channels if none are passed."""
+        self._unsubscribe(*channels)
+
+    async def get_message(
+        self, ignore_subscribe_messages: bool = False, timeout: float = 0
+    ) -> Optional[Dict]:
+        """Get the next message, waiting up to timeout seconds for one."""
+        loop = asyncio.get_event_loop()
+        deadline = time.time() + timeout
+        published = asyncio.Event()
+
+        def wake() -> None:
+            loop.call_soon_threadsafe(published.set)
+
+        with self.commands.store.waiting(wake):
+            while True:
+                published.clear()
+                message = await loop.run_in_executor(None, self._next)
+                remaining = deadline - time.time()
+                if message is not None or remaining <= 0:
+                    return message
+                try:
+                    await asyncio.wait_for(
+                        published.wait(), timeout=min(remaining, POLL_INTERVAL)
+                    )
+                except asyncio.TimeoutError:
+                    pass
+
+
+class LocalPipeline:
+    """Queue commands & run them in a single transaction."""
+
+    def __init__(self, commands: LocalCommands) -> None:
+        """Initialize the pipeline."""
+        self.commands = commands
+        self.queued: List[Tuple[str, tuple, dict]] = []
+
+    def _queue(self, name: str, *args: Any, **kwargs: Any) -> None:
+        self.queued.append((name, args, kwargs))
+
+    def _execute(self) -> List[Any]:
+        queued, self.queued = self.queued, []
+        write = any(n not in READ_COMMANDS for n, _, _ in queued)
+        with self.commands.transaction(write):
+            return [getattr(self.commands, n)(*a, **k) for n, a, k in queued]
+
+
+class SyncLocalPipeline(LocalPipeline):
+    """Queue commands & run them in a single transaction."""
+
+    def __getattr__(self, name: str) -> Any:
+        """Queue a command."""
+        getattr(self.commands, name)
+        return lambda *args, **kwargs: self._queue(name, *args, **kwargs)
+
+    def zincrby(self, key: str, amount: float, member: Value) -> None:
+        """Queue a sorted set member's score increment."""
+        self._queue("zincrby", key, member, amount)
+
+    def execute(self) -> List[Any]:
+        """Run every queued command."""
+        return self._execute()
+
+
+class AsyncLocalPipeline(LocalPipeline):
+    """Queue commands & run them in a single transaction."""
+
+    def __getattr__(self, name: str) -> Any:
+        """Queue a command."""
+        getattr(self.commands, name)
+
+        async def queue(*args: Any, **kwargs: Any) -> None:
+            self._queue(name, *args, **kwargs)
+
+        return queue
+
+    async def execute(self) -> List[Any]:
+        """Run every queued command in a thread."""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self._execute)
+
+
+class SyncLocalRedis(LocalCommands):
+    """Local replacement for the redis-py client."""
+
+    def zincrby(self, key: str, amount: float, member: Value) -> float:
+        """Increment a sorted set member's score."""
+        return super().zincrby(key, member, amount)
+
+    def pipeline(self, transaction: bool = True) -> SyncLocalPipeline:
+        """Get a pipeline."""
+        return SyncLocalPipeline(LocalCommands(self.store, self.db, self.error))
+
+    def pubsub(self) -> SyncLocalPubSub:
+        """Get a subscriber."""
+        return SyncLocalPubSub(self)
+
+    def scan_iter(
+        self, match: Optional[str] = None, count: Optional[int] = None
+    ) -> Iterator[bytes]:
+        """Iterate over keys matching a pattern."""
+        yield from self.scan(match)
+
+
+class AsyncLocalRedis:
+    """Local replacement for the aredis client.
+
+    Commands run in the default executor, so waiting for another process
+    to release the database's write lock never blocks the event loop.
+    """
+
+    def __init__(self, store: LocalStore, db: int, error: Type[Exception]) -> None:
+        """Initialize the client."""
+        self.commands = LocalCommands(store, db, error)
+
+    def __repr__(self) -> str:
+        """Represent client state."""
+        return "AsyncLocalRedis(path={}, db={})".format(
+            self.commands.store.path, self.commands.db
+        )
+
+    def __getattr__(self, name: str) -> Any:
+        """Run a command in a thread."""
+        command = getattr(self.commands, name)
+
+        async def run(*args: Any, **kwargs: Any) -> Any:
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(None, partial(command, *args, **kwargs))
+
+        return run
+
+    async def pipeline(self, transaction: bool = True) -> AsyncLocalPipeline:
+        """Get a pipeline."""
+        return AsyncLocalPipeline(self.commands)
+
+    def pubsub(self) -> AsyncLocalPubSub:
+        """Get a subscriber."""
+        return AsyncLocalPubSub(self.commands)
+
+    async def scan_iter(
+        self, match: Optional[str] = None, count: Optional[int] = None
+    ) -> AsyncIterator[bytes]:
+        """Iterate over keys matching a pattern."""
+        loop = asyncio.get_event_loop()
+        for key in await loop.run_in_executor(None, self.commands.scan, match):
+            yield key
@@ -0,0 +1,112 @@
+"""Per-worker, in-memory cache tier in front of Redis."""
+
+# Standard Library
+import time
+import threading
+from typing import Any, Set, Dict, Tuple, Optional
+from collections import OrderedDict
+
+# Redis pub/sub channel on which cache writes are announced, so every
+# worker can evict its local copy of the written key.
+INVALIDATION_CHANNEL = "hyperglass.cache.invalidate"
+
+LocalKey = Tuple[str, Optional[str]]
+
+
+class LRUCache:
+    """Keep recently read cache values in memory, bounded by size & age.
+
+    Values are keyed by Redis key & hash field, where a field of `None`
+    refers to the entire key. Values are stored as returned from Redis
+    and shared between readers, so they must not be modified.
+    """
+
+    def __init__(self, max_entries: int, ttl: int) -> None:
+        """Initialize the cache."""
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[LocalKey, Tuple[Any, float]]" = OrderedDict()
+        self._fields: Dict[str, Set[Optional[str]]] = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+
+    def __repr__(self) -> str:
+        """Represent cache state."""
+        return "LRUCache(entries={}, max_entries={}, ttl={})".format(
+            len(self._entries), self.max_entries, self.ttl
+        )
+
+    @property
+    def generation(self) -> int:
+        """Get a counter incremented by every eviction."""
+        return self._generation
+
+    def get(self, key: str, field: Optional[str] = None) -> Any:
+        """Get an unexpired value, or None if it is not cached."""
+        with self._lock:
+            cached = self._entries.get((key, field))
+            if cached is None:
+                return None
+
+            value, expires = cached
+            if expires < time.monotonic():
+                self._remove((key, field))
+                return None
+
+            self._entries.move_to_end((key, field))
+            return value
+
+    def put(
+        self, key: str, value: Any, field: Optional[str] = None, generation: int = -1
+    ) -> None:
+        """Cache a value read from Redis.
+
+        If generation is passed, the value is only cached if nothing has
+        been evicted since it was read, as it may already be stale.
+        """
+        if value is None or value == {}:
+            return
+
+        with self._lock:
+            if generation not in (-1, self._generation):
+                return
+
+            self._entries[(key, field)] = (value, time.monotonic() + self.ttl)
+            self._entries.move_to_end((key, field))
+            self._fields.setdefault(key, set()).add(field)
+
+            while len(self._entries) > self.max_entries:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+
+    def evict(self, key: str, field: Optional[str] = None) -> None:
+        """Evict a key's field, or all of a key's fields if none is passed."""
+        with self._lock:
+            self._generation += 1
+            fields = self._fields.get(key, set())
+
+            if field is None:
+                evicted = tuple(fields)
+            else:
+                # Any copy of the entire key includes the field.
+                evicted = (field, None)
+
+            for name in evicted:
+                self._remove((key, name))
+
+    def clear(self) -> None:
+        """Evict all values."""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._fields.clear()
+
+    def _remove(self, local_key: LocalKey) -> None:
+        key, field = local_key
+        self._entries.pop(local_key, None)
+        fields = self._fields.get(key)
+
+        if fields is not None:
+            fields.discard(field)
+            if not fields:
+                del self._fields[key]
@@ -1,10 +1,11 @@
 """Non-asyncio Redis cache handler."""
 
 # Standard Library
-import json
 import time
 import pickle
-from typing import Any, Dict
+import fnmatch
+import secrets
+from typing import Any, Dict, List, Optional, Sequence
 
 # Third Party
 from redis import Redis as SyncRedis
@@ -12,8 +13,10 @@ from redis.client import PubSub as SyncPubsSub
 from redis.exceptions import RedisError
 
 # Project
-from hyperglass.cache.base import BaseCache
+from hyperglass.cache.lru import INVALIDATION_CHANNEL
+from hyperglass.cache.base import SCAN_COUNT, BaseCache
 from hyperglass.exceptions import HyperglassError
+from hyperglass.cache.local import SyncLocalRedis, local_store
 
 
 class SyncCache(BaseCache):
@@ -27,14 +30,16 @@ class SyncCache(BaseCache):
         if password is not None:
             password = password.get_secret_value()
 
-        self.instance: SyncRedis = SyncRedis(
-            db=self.db,
-            host=self.host,
-            port=self.port,
-            password=password,
-            decode_responses=self.decode_responses,
-            **self.redis_args,
-        )
+        if self.backend == "redis":
+            self.instance: SyncRedis = SyncRedis(
+                db=self.db,
+                host=self.host,
+                port=self.port,
+                password=password,
+                **self.redis_args,
+            )
+        else:
+            self.instance = SyncLocalRedis(local_store(self.path), self.db, RedisError)
 
     def test(self):
         """Send an echo to Redis to ensure it can be reached."""
@@ -67,37 +72,81 @@ class SyncCache(BaseCache):
         """Get item(s) from cache."""
         if len(args) == 1:
             raw = self.instance.get(args[0])
-        else:
-            raw = self.instance.mget(args)
-        return self.parse_types(raw)
+            return self.decode(raw)
+
+        raw = self.instance.mget(args)
+        return self.decode_many(raw)
 
     def get_dict(self, key: str, field: str = "") -> Any:
         """Get hash map (dict) item(s)."""
-        if not field:
-            raw = self.instance.hgetall(key)
-        else:
-            raw = self.instance.hget(key, str(field))
+        field = str(field) or None
+        cached, generation = self.local_get(key, field)
 
-        return self.parse_types(raw)
+        if cached is not None:
+            return cached
 
-    def set(self, key: str, value: str) -> bool:
+        if field is None:
+            value = self.decode_dict(self.instance.hgetall(key))
+        else:
+            value = self.decode(self.instance.hget(key, field))
+
+        self.local_put(key, value, field, generation)
+        return value
+
+    def get_entry(self, key: str, seconds: Optional[int] = None) -> Dict:
+        """Get a hash map (dict) & reset its timeout in one round trip."""
+        cached, generation = self.local_get(key)
+
+        if cached is not None:
+            return cached
+
+        pipeline = self.instance.pipeline(transaction=True)
+        pipeline.hgetall(key)
+        if seconds is not None:
+            pipeline.expire(key, seconds)
+        raw, *_ = pipeline.execute()
+        value = self.decode_dict(raw)
+
+        self.local_put(key, value, generation=generation)
+        return value
+
+    def set_entry(self, key: str, mapping: Dict, seconds: int) -> None:
+        """Set a hash map (dict) & its timeout in one round trip."""
+        pipeline = self.instance.pipeline(transaction=True)
+        pipeline.delete(key)
+        pipeline.hset(key, mapping={k: self.encode(v) for k, v in mapping.items()})
+        pipeline.expire(key, seconds)
+        pipeline.execute()
+        self.invalidate(key)
+
+    def set(self, key: str, value: Any) -> bool:
         """Set cache values."""
-        return self.instance.set(key, str(value))
-
-    def set_dict(self, key: str, field: str, value: str) -> bool:
+        return self.instance.set(key, self.encode(value))
+
+    def get_many(self, keys: Sequence[str]) -> List[Any]:
+        """Get multiple items from cache in one round trip, in the order of keys."""
+        if not keys:
+            return []
+        return self.decode_many(self.instance.mget(keys))
+
+    def set_many(self, mapping: Dict[str, Any], seconds: int) -> None:
+        """Set multiple cache values, each with its own timeout, in one round trip."""
+        pipeline = self.instance.pipeline(transaction=True)
+        for key, value in mapping.items():
+            pipeline.set(key, self.encode(value), ex=seconds)
+        pipeline.execute()
+
+    def set_dict(self, key: str, field: str, value: Any) -> bool:
         """Set hash map (dict) values."""
         success = False
 
-        if isinstance(value, Dict):
-            value = json.dumps(value)
-        else:
-            value = str(value)
-
-        response = self.instance.hset(key, str(field), value)
+        response = self.instance.hset(key, str(field), self.encode(value))
 
         if response in (0, 1):
             success = True
 
+        self.invalidate(key, str(field))
+
         return success
 
     def wait(self, pubsub: SyncPubsSub, timeout: int = 30, **kwargs) -> Any:
@@ -107,11 +156,16 @@ class SyncCache(BaseCache):
 
         while now < timeout:
 
+            if self.backend != "redis":
+                # Local subscribers are woken when a message is published,
+                # so wait for one rather than polling.
+                kwargs["timeout"] = timeout - now
+
             message = pubsub.get_message(ignore_subscribe_messages=True, **kwargs)
 
             if message is not None and message["type"] == "message":
                 data = message["data"]
-                return self.parse_types(data)
+                return self.decode(data)
 
             time.sleep(0.01)
             now = time.time()
@@ -122,18 +176,85 @@ class SyncCache(BaseCache):
         """Provide a redis.client.Pubsub instance."""
         return self.instance.pubsub()
 
-    def pub(self, key: str, value: str) -> None:
+    def pub(self, key: str, value: Any, delay: float = 1) -> None:
         """Publish a value."""
-        time.sleep(1)
-        self.instance.publish(key, value)
+        time.sleep(delay)
+        self.instance.publish(key, self.encode(value))
+
+    def invalidate(self, key: Optional[str], field: Optional[str] = None) -> None:
+        """Evict a written key from every worker's local tier."""
+        if self.local is None:
+            return
+
+        if key is None:
+            self.local.clear()
+        else:
+            self.local.evict(key, field)
+
+        self.instance.publish(INVALIDATION_CHANNEL, self.encode([key, field]))
+
+    def count(self, key: str, member: str, seconds: int, amount: int = 1) -> None:
+        """Increment a member's count in a sorted set & set the set's timeout."""
+        pipeline = self.instance.pipeline(transaction=True)
+        pipeline.zincrby(key, amount, member)
+        pipeline.expire(key, seconds)
+        pipeline.execute()
+
+    def counts(self, keys: Sequence[str], member: str) -> float:
+        """Get the sum of a member's counts in one or more sorted sets."""
+        pipeline = self.instance.pipeline(transaction=True)
+        for key in keys:
+            pipeline.zscore(key, member)
+        scores = pipeline.execute()
+        return sum(s for s in scores if s is not None)
+
+    def top(self, keys: Sequence[str], count: int) -> List[str]:
+        """Get the members with the highest total counts in one or more sorted sets."""
+        union = "{}.{}".format(keys[0], secrets.token_hex(8))
+        pipeline = self.instance.pipeline(transaction=True)
+        pipeline.zunionstore(union, keys)
+        pipeline.zrevrange(union, 0, count - 1)
+        pipeline.delete(union)
+        _, members, _ = pipeline.execute()
+        return [m.decode("utf-8") for m in members]
+
+    def lease(self, key: str, seconds: int) -> bool:
+        """Acquire an expiring lease on a key, only if it is not already held."""
+        acquired = self.instance.set(key, "1", ex=seconds, nx=True)
+        return bool(acquired)
 
     def clear(self) -> None:
         """Clear the cache."""
         self.instance.flushdb()
+        self.invalidate(None)
 
     def delete(self, *keys: str) -> None:
         """Delete a cache key."""
         self.instance.delete(*keys)
+        for key in keys:
+            self.invalidate(key)
+
+    def delete_matching(self, pattern: str, keep: Optional[str] = None) -> int:
+        """Delete all keys matching a pattern, except keys matching keep."""
+        deleted = 0
+        keys = []
+
+        for key in self.instance.scan_iter(match=pattern, count=SCAN_COUNT):
+            key = key.decode("utf-8")
+            if keep is None or not fnmatch.fnmatchcase(key, keep):
+                keys.append(key)
+
+            if len(keys) == SCAN_COUNT:
+                deleted += self.instance.delete(*keys)
+                keys = []
+
+        if keys:
+            deleted += self.instance.delete(*keys)
+
+        if deleted:
+            self.invalidate(None)
+
+        return deleted
 
     def expire(self, *keys: str, seconds: int) -> None:
         """Set timeout of key in seconds."""
@@ -143,5 +264,5 @@ class SyncCache(BaseCache):
     def get_config(self) -> Dict:
         """Get picked config object from cache."""
 
-        pickled = self.instance.get("HYPERGLASS_CONFIG")
+        pickled = self.get("HYPERGLASS_CONFIG")
         return pickle.loads(pickled)
@@ -192,14 +192,29 @@ def get_system_info():
     "clear-cache",
     help=cmd_help(E.SOAP, "Clear the Redis cache", supports_color),
     cls=HelpColorsCommand,
+    help_options_custom_colors=random_colors("-d", "-q"),
 )
-def clear_cache():
-    """Clear the Redis Cache."""
+@option(
+    "-d",
+    "--device",
+    "device",
+    default=None,
+    help="Only clear a device's cache [name or ID]",
+)
+@option(
+    "-q",
+    "--query-type",
+    "query_type",
+    default=None,
+    help="Only clear a query type's cache",
+)
+def clear_cache(device, query_type):
+    """Clear cached query output, optionally only a device's or query type's."""
     # Project
     from hyperglass.util import sync_clear_redis_cache
 
     try:
-        sync_clear_redis_cache()
-        success("Cleared Redis Cache")
+        deleted = sync_clear_redis_cache(device=device, query_type=query_type)
+        success("Cleared {d} Redis Cache entries", d=deleted)
     except RuntimeError as err:
         error(str(err))
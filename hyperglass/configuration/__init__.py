@@ -7,6 +7,7 @@ from .main import (
     CONFIG_PATH,
     STATIC_PATH,
     REDIS_CONFIG,
+    CONFIG_VERSION,
     params,
     devices,
     commands,
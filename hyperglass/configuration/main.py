@@ -3,6 +3,7 @@
 # Standard Library
 import os
 import json
+import hashlib
 from typing import Dict, List
 from pathlib import Path
 
@@ -140,6 +141,16 @@ devices = validate_config(config=_user_devices.get("routers", []), importer=Devi
 # Validate commands are both supported and properly mapped.
 validate_nos_commands(devices.all_nos, commands)
 
+# Identify this version of hyperglass & its configuration, so cached
+# query output is not reused once either has changed.
+CONFIG_VERSION = hashlib.sha256(
+    json.dumps(
+        (__version__, user_config, _user_commands, _user_devices),
+        sort_keys=True,
+        default=str,
+    ).encode()
+).hexdigest()[:16]
+
 # Set cache configurations to environment variables, so they can be
 # used without importing this module (Gunicorn, etc).
 set_cache_env(db=params.cache.database, host=params.cache.host, port=params.cache.port)
@@ -369,8 +380,12 @@ URL_DEV = f"http://localhost:{str(params.listen_port)}/"
 URL_PROD = "/api/"
 
 REDIS_CONFIG = {
+    "backend": params.cache.backend,
+    "path": None,
     "host": str(params.cache.host),
     "port": params.cache.port,
-    "decode_responses": True,
     "password": params.cache.password,
 }
+
+if params.cache.backend == "sqlite":
+    REDIS_CONFIG["path"] = str(params.cache.path or CONFIG_PATH / "cache.db")
@@ -1,18 +1,30 @@
 """Base Connection Class."""
 
 # Standard Library
-from typing import Dict, Union, Sequence
+import asyncio
+from typing import Dict, Union, Sequence, AsyncIterator
+
+# Third Party
+import asyncssh
 
 # Project
 from hyperglass.log import log
+from hyperglass.exceptions import ScrapeError
 from hyperglass.models.api import Query
 from hyperglass.parsing.nos import scrape_parsers, structured_parsers
+from hyperglass.configuration import params
 from hyperglass.parsing.common import parsers
 from hyperglass.models.config.devices import Device
 
 # Local
+from ._tunnel import TunnelLease, TunnelManager
 from ._construct import Construct
 
+TUNNELS = TunnelManager(
+    idle_timeout=params.connections.tunnels.idle_timeout,
+    keepalive=params.connections.tunnels.keepalive,
+)
+
 
 class Connection:
     """Base transport driver class."""
@@ -26,7 +38,77 @@ class Connection:
         self._query = Construct(device=self.device, query_data=self.query_data)
         self.query = self._query.queries()
 
-    async def parsed_response(  # noqa: C901 ("too complex")
+    def setup_proxy(self) -> TunnelLease:
+        """Get a lease on the shared SSH tunnel to this device's proxy."""
+
+        proxy = self.device.proxy
+
+        tunnel_kwargs = {"username": proxy.credential.username, "known_hosts": None}
+        if proxy.credential._method == "password":
+            # Use password auth if no key is defined.
+            tunnel_kwargs["password"] = proxy.credential.password.get_secret_value()
+        else:
+            # Otherwise, use key auth.
+            tunnel_kwargs["client_keys"] = [proxy.credential.key.as_posix()]
+            if proxy.credential._method == "encrypted_key":
+                # If the key is encrypted, use the password field as the
+                # private key password.
+                tunnel_kwargs[
+                    "passphrase"
+                ] = proxy.credential.password.get_secret_value()
+
+        return TUNNELS.tunnel(self.device, params.connect_timeout, **tunnel_kwargs)
+
+    async def proxied_collect(self) -> Sequence:
+        """Collect output from the device through its proxy's tunnel."""
+        try:
+            async with self.setup_proxy() as (host, port):
+                return await self.collect(host, port)
+
+        except (asyncssh.Error, asyncio.TimeoutError, OSError) as scrape_proxy_error:
+            raise self._proxy_error(scrape_proxy_error)
+
+    async def stream(self, host: str = None, port: int = None) -> AsyncIterator[str]:
+        """Yield each line of output once the device's output is collected.
+
+        Drivers able to read output as the device produces it override
+        this.
+        """
+        for response in await self.collect(host, port):
+            for line in response.splitlines():
+                yield line
+
+    async def proxied_stream(self) -> AsyncIterator[str]:
+        """Stream output from the device through its proxy's tunnel."""
+        try:
+            async with self.setup_proxy() as (host, port):
+                async for line in self.stream(host, port):
+                    yield line
+
+        except (asyncssh.Error, asyncio.TimeoutError, OSError) as scrape_proxy_error:
+            raise self._proxy_error(scrape_proxy_error)
+
+    def _proxy_error(self, err: Exception) -> ScrapeError:
+        """Get the error for a failed connection to the device's proxy."""
+        proxy = self.device.proxy
+        log.error(
+            f"Error connecting to device {self.device.name} via proxy {proxy.name}"
+        )
+        return ScrapeError(
+            params.messages.connection_error,
+            device_name=self.device.name,
+            proxy=proxy.name,
+            error=str(err) or params.messages.request_timeout,
+        )
+
+    async def parsed_response(
+        self, output: Sequence[str]
+    ) -> Union[str, Sequence[Dict]]:
+        """Parse output in a thread so the event loop isn't blocked while parsing."""
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self.parse, output)
+
+    def parse(  # noqa: C901 ("too complex")
         self, output: Sequence[str]
     ) -> Union[str, Sequence[Dict]]:
         """Send output through common parsers."""
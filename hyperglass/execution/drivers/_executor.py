@@ -0,0 +1,107 @@
+"""Bounded thread pool for drivers that only provide blocking I/O."""
+
+# Standard Library
+import asyncio
+import threading
+from typing import Any, Dict, Callable, Hashable
+from concurrent.futures import Future, ThreadPoolExecutor
+
+# Project
+from hyperglass.log import log
+
+
+class BoundedExecutor:
+    """Run blocking calls in a size-limited thread pool.
+
+    Calls are limited per key (device) as well as globally, so a single
+    busy device cannot take every thread, and the event loop is never
+    blocked by driver I/O.
+    """
+
+    def __init__(self, max_workers: int, max_per_key: int, name: str) -> None:
+        """Initialize the thread pool."""
+        self.name = name
+        self.max_workers = max_workers
+        self.max_per_key = max_per_key
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix=f"hyperglass-{name}"
+        )
+        self._limits: Dict[Hashable, asyncio.Semaphore] = {}
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._queued = 0
+        self._running = 0
+
+    def __repr__(self) -> str:
+        """Represent executor state."""
+        return "BoundedExecutor(name={}, {})".format(
+            self.name, ", ".join(f"{k}={v}" for k, v in self.stats().items())
+        )
+
+    def stats(self) -> Dict[str, int]:
+        """Get current queue depth & utilization."""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "waiting": self._waiting,
+                "queued": self._queued,
+                "running": self._running,
+            }
+
+    def limit(self, key: Hashable) -> asyncio.Semaphore:
+        """Get the semaphore limiting concurrent calls for a key."""
+        if key not in self._limits:
+            self._limits[key] = asyncio.Semaphore(self.max_per_key)
+        return self._limits[key]
+
+    async def run(self, key: Hashable, func: Callable, *args: Any) -> Any:
+        """Run a blocking function in the thread pool & await its result."""
+        limit = self.limit(key)
+
+        with self._lock:
+            self._waiting += 1
+        try:
+            await limit.acquire()
+        finally:
+            with self._lock:
+                self._waiting -= 1
+
+        loop = asyncio.get_event_loop()
+
+        try:
+            with self._lock:
+                self._queued += 1
+            future = self._executor.submit(self._call, func, *args)
+        except BaseException:
+            with self._lock:
+                self._queued -= 1
+            limit.release()
+            raise
+
+        def done(future: Future) -> None:
+            # A call cancelled while still queued never reaches _call.
+            if future.cancelled():
+                with self._lock:
+                    self._queued -= 1
+            loop.call_soon_threadsafe(limit.release)
+
+        # The key's slot is only released once the thread has actually
+        # finished, even if the awaiting task is cancelled first.
+        future.add_done_callback(done)
+
+        log.debug("{!r}", self)
+        return await asyncio.wrap_future(future)
+
+    def shutdown(self) -> None:
+        """Stop accepting new calls."""
+        self._executor.shutdown(wait=False)
+
+    def _call(self, func: Callable, *args: Any) -> Any:
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
@@ -0,0 +1,115 @@
+"""Per-worker persistent HTTP clients for devices running hyperglass-agent."""
+
+# Standard Library
+import ssl
+import asyncio
+from typing import Dict, Tuple, Union
+
+# Third Party
+import httpx
+
+# Project
+from hyperglass.log import log
+from hyperglass.exceptions import RestError
+from hyperglass.util.tasks import run_in_background
+from hyperglass.models.config.devices import Device
+
+Verify = Union[bool, ssl.SSLContext]
+
+
+class HttpClients:
+    """Keep one HTTP client open per device for connection reuse.
+
+    Each client keeps its connections to the device alive between
+    queries, and negotiates HTTP/2 over TLS when enabled. SSL contexts
+    are built once per device, rather than reading the device's
+    certificate for every query, and rebuilt when the certificate file
+    changes. A device's client is replaced when its SSL context is.
+    """
+
+    def __init__(
+        self,
+        max_connections: int,
+        keepalive_expiry: int,
+        http2: bool,
+        timeout: httpx.Timeout,
+    ) -> None:
+        """Initialize the clients."""
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2
+        self.timeout = timeout
+        self._clients: Dict[str, Tuple[str, Verify, httpx.AsyncClient]] = {}
+        self._contexts: Dict[Tuple[str, bool], Tuple[int, ssl.SSLContext]] = {}
+
+    def __repr__(self) -> str:
+        """Represent client state."""
+        return "HttpClients(devices={}, http2={})".format(
+            len(self._clients), self.http2
+        )
+
+    def ssl_context(self, device: Device, check_hostname: bool) -> ssl.SSLContext:
+        """Get an SSL context that only trusts a device's certificate."""
+        key = (device.name, check_hostname)
+        mtime = device.ssl.cert.stat().st_mtime_ns
+        cached = self._contexts.get(key)
+
+        if cached is None or cached[0] != mtime:
+            log.debug("Loading SSL certificate for {}", device.name)
+            with device.ssl.cert.open("r") as file:
+                cert = file.read()
+                if not cert:
+                    raise RestError(
+                        "SSL Certificate for device {d} has not been imported",
+                        level="danger",
+                        d=device.name,
+                    )
+            context = ssl.create_default_context(cadata=cert)
+            context.check_hostname = check_hostname
+            self._contexts[key] = (mtime, context)
+
+        return self._contexts[key][1]
+
+    def client(
+        self, device: Device, base_url: str, verify: Verify
+    ) -> httpx.AsyncClient:
+        """Get a device's client, replacing it if its URL or SSL context changed."""
+        current = self._clients.get(device.name)
+
+        if current is not None:
+            url, current_verify, client = current
+            if url == base_url and current_verify is verify and not client.is_closed:
+                return client
+            # A proxied device's local address changes when its tunnel
+            # is reopened, & its SSL context when its certificate changes.
+            run_in_background(client.aclose())
+
+        log.debug("Opening HTTP client for {} at {}", device.name, base_url)
+        client = httpx.AsyncClient(
+            base_url=base_url,
+            verify=verify,
+            http2=self.http2,
+            limits=self.limits,
+            timeout=self.timeout,
+            headers={"Content-Type": "application/json"},
+        )
+        self._clients[device.name] = (base_url, verify, client)
+        return client
+
+    def evict(self, device_name: str) -> None:
+        """Close a device's client & forget its SSL contexts."""
+        for key in [k for k in self._contexts if k[0] == device_name]:
+            del self._contexts[key]
+
+        current = self._clients.pop(device_name, None)
+        if current is not None:
+            run_in_background(current[2].aclose())
+
+    async def close(self) -> None:
+        """Close all clients."""
+        clients = [c for _, _, c in self._clients.values()]
+        self._clients = {}
+        await asyncio.gather(*(c.aclose() for c in clients))
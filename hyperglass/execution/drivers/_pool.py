@@ -0,0 +1,186 @@
+"""Per-worker pool of persistent, authenticated device sessions."""
+
+# Standard Library
+import time
+import asyncio
+from typing import Any, Dict, List, Tuple, Callable, Hashable, Optional, Awaitable
+
+# Project
+from hyperglass.log import log
+from hyperglass.util.tasks import run_in_background
+
+# Time in seconds a pooled session has to respond to a health check.
+HEALTH_CHECK_TIMEOUT = 5
+
+SessionFactory = Callable[[], Awaitable[Any]]
+
+
+class PooledSession:
+    """Check a session out of the pool for the duration of a context."""
+
+    def __init__(
+        self,
+        pool: "SessionPool",
+        key: Hashable,
+        factory: SessionFactory,
+        address: Hashable = None,
+    ) -> None:
+        """Initialize the checkout."""
+        self.pool = pool
+        self.key = key
+        self.factory = factory
+        self.address = address
+        self.session = None
+
+    async def __aenter__(self) -> Any:
+        """Get a healthy idle session, or open a new one."""
+        limit = self.pool.limit(self.key)
+        await limit.acquire()
+        try:
+            self.session = await self.pool.checkout(self.key, self.factory)
+        except BaseException:
+            limit.release()
+            raise
+        return self.session
+
+    async def __aexit__(self, exc_type=None, exc_value=None, traceback=None) -> None:
+        """Return the session to the pool, unless it failed during use."""
+        try:
+            if exc_type is None:
+                self.pool.checkin(self.key, self.session, self.address)
+            else:
+                self.pool.discard(self.session)
+        finally:
+            self.pool.limit(self.key).release()
+
+
+class SessionPool:
+    """Keep authenticated sessions open for reuse by subsequent queries.
+
+    Sessions are keyed by device, and each key is limited to a maximum
+    number of concurrently checked-out sessions. Idle sessions are
+    health-checked before reuse, kept alive on an interval, and closed
+    once they have been idle for longer than the idle timeout. Sessions
+    to a key's previous address, e.g. a replaced proxy tunnel's local
+    port, are closed rather than reused.
+    """
+
+    def __init__(self, max_sessions: int, idle_timeout: int, keepalive: int) -> None:
+        """Initialize the pool."""
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.keepalive = keepalive
+        self._idle: Dict[Hashable, List[Tuple[Any, float]]] = {}
+        self._limits: Dict[Hashable, asyncio.Semaphore] = {}
+        self._addresses: Dict[Hashable, Hashable] = {}
+        self._maintainer: Optional[asyncio.Future] = None
+
+    def __repr__(self) -> str:
+        """Represent pool state."""
+        return "SessionPool(devices={}, idle={})".format(
+            len(self._limits), sum(len(s) for s in self._idle.values())
+        )
+
+    def session(
+        self, key: Hashable, factory: SessionFactory, address: Hashable = None
+    ) -> PooledSession:
+        """Get a session for a key, opening one with factory if none are idle."""
+        if self._maintainer is None or self._maintainer.done():
+            self._maintainer = asyncio.ensure_future(self._maintain())
+
+        if self._addresses.get(key, address) != address:
+            log.debug("Address of {} changed, closing its pooled sessions", key)
+            for session, _ in self._idle.get(key, []):
+                self.discard(session)
+            self._idle[key] = []
+        self._addresses[key] = address
+
+        return PooledSession(self, key, factory, address)
+
+    def limit(self, key: Hashable) -> asyncio.Semaphore:
+        """Get the semaphore limiting concurrent sessions for a key."""
+        if key not in self._limits:
+            self._limits[key] = asyncio.Semaphore(self.max_sessions)
+        return self._limits[key]
+
+    async def checkout(self, key: Hashable, factory: SessionFactory) -> Any:
+        """Get the most recently used healthy session, or open a new one."""
+        idle = self._idle.get(key, [])
+
+        while idle:
+            session, _ = idle.pop()
+            if await self._healthy(session):
+                log.debug("Reusing pooled session for {}", key)
+                return session
+            log.debug("Pooled session for {} failed health check", key)
+            self.discard(session)
+
+        log.debug("Opening new pooled session for {}", key)
+        return await factory()
+
+    def checkin(self, key: Hashable, session: Any, address: Hashable = None) -> None:
+        """Return a session to the pool, unless its key's address has changed."""
+        if self._addresses.get(key) != address:
+            self.discard(session)
+            return
+        self._idle.setdefault(key, []).append((session, time.monotonic()))
+
+    def discard(self, session: Any) -> None:
+        """Close a session in the background without waiting for it."""
+        run_in_background(self._close(session))
+
+    async def close(self) -> None:
+        """Close all idle sessions & stop maintenance."""
+        if self._maintainer is not None:
+            self._maintainer.cancel()
+
+        sessions = [s for idle in self._idle.values() for s, _ in idle]
+        self._idle = {}
+        await asyncio.gather(*(self._close(s) for s in sessions))
+
+    async def _healthy(self, session: Any) -> bool:
+        """Ensure a session's channel is alive and responsive."""
+        try:
+            if not session.isalive():
+                return False
+            await asyncio.wait_for(session.get_prompt(), timeout=HEALTH_CHECK_TIMEOUT)
+            return True
+        except Exception as err:
+            log.debug("Session health check failed: {}", str(err))
+            return False
+
+    async def _close(self, session: Any) -> None:
+        try:
+            await asyncio.wait_for(session.close(), timeout=HEALTH_CHECK_TIMEOUT)
+        except Exception as err:
+            log.debug("Error closing session: {}", str(err))
+
+    async def _maintain(self) -> None:
+        """Evict expired idle sessions & keep the remaining sessions alive."""
+        while True:
+            await asyncio.sleep(self.keepalive)
+            now = time.monotonic()
+
+            for key, idle in list(self._idle.items()):
+                address = self._addresses.get(key)
+                keep = []
+                # Take ownership of all idle sessions for this key while
+                # they are being checked, so they can't be checked out.
+                self._idle[key] = []
+
+                for session, last_used in idle:
+                    if now - last_used > self.idle_timeout:
+                        log.debug("Closing idle pooled session for {}", key)
+                        self.discard(session)
+                    elif await self._healthy(session):
+                        keep.append((session, last_used))
+                    else:
+                        self.discard(session)
+
+                if self._addresses.get(key) != address:
+                    # The address changed while the sessions were checked.
+                    for session, _ in keep:
+                        self.discard(session)
+                    keep = []
+
+                self._idle[key] = keep + self._idle[key]
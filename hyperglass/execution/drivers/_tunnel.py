@@ -0,0 +1,187 @@
+"""Long-lived SSH tunnels to devices behind SSH proxies."""
+
+# Standard Library
+import time
+import asyncio
+from typing import Dict, Tuple, Optional
+
+# Third Party
+import asyncssh
+
+# Project
+from hyperglass.log import log
+from hyperglass.models.config.proxy import Proxy
+from hyperglass.models.config.devices import Device
+
+Address = Tuple[str, int]
+
+
+class ProxyClient(asyncssh.SSHClient):
+    """Track the state of an SSH connection to a proxy."""
+
+    def __init__(self, proxy: Proxy) -> None:
+        """Initialize the client."""
+        self.proxy = proxy
+        self.connected = False
+
+    def connection_made(self, conn: asyncssh.SSHClientConnection) -> None:
+        """Mark the connection as open."""
+        self.connected = True
+
+    def connection_lost(self, exc: Optional[Exception]) -> None:
+        """Mark the connection as closed so it is reopened on next use."""
+        self.connected = False
+        if exc is not None:
+            log.error("SSH connection to proxy {} lost: {}", self.proxy.name, exc)
+
+
+class ProxyTunnel:
+    """One SSH connection to a proxy, forwarding to every device behind it.
+
+    Each device is forwarded from a local listener over `direct-tcpip`
+    channels multiplexed on the proxy's SSH connection. Forwarded data
+    is copied natively by asyncio, using asyncssh's default 2MB channel
+    window.
+    """
+
+    def __init__(self, proxy: Proxy, timeout: int, **kwargs) -> None:
+        """Initialize the tunnel without connecting."""
+        self.proxy = proxy
+        self.timeout = timeout
+        self.kwargs = kwargs
+        self.client: Optional[ProxyClient] = None
+        self.connection: Optional[asyncssh.SSHClientConnection] = None
+        self.listeners: Dict[Address, asyncssh.SSHListener] = {}
+        self.lock = asyncio.Lock()
+        self.users = 0
+        self.last_used = time.monotonic()
+
+    def __repr__(self) -> str:
+        """Represent tunnel state."""
+        return "ProxyTunnel(proxy={}, devices={}, active={}, users={})".format(
+            self.proxy.name, len(self.listeners), self.active, self.users
+        )
+
+    @property
+    def active(self) -> bool:
+        """Determine if the SSH connection to the proxy is open."""
+        return self.client is not None and self.client.connected
+
+    async def start(self) -> None:
+        """Connect to the proxy."""
+        await self.stop()
+        log.debug("Opening SSH tunnel via proxy {}", self.proxy.name)
+        self.client = ProxyClient(self.proxy)
+        self.connection = await asyncio.wait_for(
+            asyncssh.connect(
+                self.proxy._target,
+                self.proxy.port,
+                client_factory=lambda: self.client,
+                **self.kwargs,
+            ),
+            timeout=self.timeout,
+        )
+
+    async def stop(self) -> None:
+        """Close the SSH connection & all local listeners."""
+        if self.connection is not None:
+            log.debug("Closing SSH tunnel via proxy {}", self.proxy.name)
+            self.connection.close()
+            await self.connection.wait_closed()
+        self.client = None
+        self.connection = None
+        self.listeners = {}
+
+    async def local_address(self, remote: Address) -> Address:
+        """Get the local address forwarded to a remote address."""
+        if remote not in self.listeners:
+            self.listeners[remote] = await self.connection.forward_local_port(
+                "localhost", 0, *remote
+            )
+        return ("localhost", self.listeners[remote].get_port())
+
+
+class TunnelLease:
+    """Use a proxy tunnel for the duration of a context."""
+
+    def __init__(self, manager: "TunnelManager", tunnel: ProxyTunnel, remote: Address):
+        """Initialize the lease."""
+        self.manager = manager
+        self.tunnel = tunnel
+        self.remote = remote
+
+    async def __aenter__(self) -> Address:
+        """Ensure the tunnel is up & get the device's local address."""
+        self.tunnel.users += 1
+        try:
+            return await self.manager.ensure(self.tunnel, self.remote)
+        except BaseException:
+            await self.__aexit__()
+            raise
+
+    async def __aexit__(self, exc_type=None, exc_value=None, traceback=None) -> None:
+        """Release the tunnel, closing it if it should not be kept open."""
+        self.tunnel.users -= 1
+        self.tunnel.last_used = time.monotonic()
+        if self.manager.idle_timeout == 0 and self.tunnel.users == 0:
+            await self.manager.stop(self.tunnel)
+
+
+class TunnelManager:
+    """Keep one SSH connection open per proxy for all devices behind it.
+
+    Tunnels are opened on first use, reopened if the connection to the
+    proxy fails, and closed once unused for longer than the idle
+    timeout.
+    """
+
+    def __init__(self, idle_timeout: int, keepalive: int) -> None:
+        """Initialize the manager."""
+        self.idle_timeout = idle_timeout
+        self.keepalive = keepalive
+        self._tunnels: Dict[str, ProxyTunnel] = {}
+        self._maintainer: Optional[asyncio.Future] = None
+
+    def tunnel(self, device: Device, timeout: int, **kwargs) -> TunnelLease:
+        """Get a tunnel lease for a device's proxy."""
+        if self._maintainer is None or self._maintainer.done():
+            self._maintainer = asyncio.ensure_future(self._maintain())
+
+        proxy = device.proxy
+        if proxy.name not in self._tunnels:
+            self._tunnels[proxy.name] = ProxyTunnel(
+                proxy, timeout, keepalive_interval=self.keepalive, **kwargs
+            )
+        return TunnelLease(
+            self, self._tunnels[proxy.name], (device._target, device.port)
+        )
+
+    async def ensure(self, tunnel: ProxyTunnel, remote: Address) -> Address:
+        """Start a tunnel if it isn't running, & forward a remote address."""
+        async with tunnel.lock:
+            if not tunnel.active:
+                await tunnel.start()
+            return await tunnel.local_address(remote)
+
+    async def stop(self, tunnel: ProxyTunnel) -> None:
+        """Stop a tunnel."""
+        async with tunnel.lock:
+            await tunnel.stop()
+
+    async def close(self) -> None:
+        """Stop all tunnels & maintenance."""
+        if self._maintainer is not None:
+            self._maintainer.cancel()
+        await asyncio.gather(*(self.stop(t) for t in self._tunnels.values()))
+
+    async def _maintain(self) -> None:
+        """Close tunnels that have been idle for longer than the idle timeout."""
+        while True:
+            await asyncio.sleep(max(self.keepalive, 1))
+            now = time.monotonic()
+
+            for tunnel in self._tunnels.values():
+                idle = now - tunnel.last_used
+                if tunnel.active and tunnel.users == 0 and idle > self.idle_timeout:
+                    log.debug("Closing idle {!r}", tunnel)
+                    await self.stop(tunnel)
@@ -7,8 +7,9 @@ hyperglass-frr API calls, returns the output back to the front end.
 """
 
 # Standard Library
+import asyncio
 from ssl import CertificateError
-from typing import Iterable
+from typing import List, Union, Iterable
 
 # Third Party
 import httpx
@@ -21,31 +22,42 @@ from hyperglass.exceptions import RestError, ResponseEmpty
 from hyperglass.configuration import params
 
 # Local
+from ._http import HttpClients
 from ._common import Connection
 
+QUERY_ENDPOINT = "/query/"
+BATCH_ENDPOINT = "/query/batch/"
+
+AGENT_CLIENTS = HttpClients(
+    max_connections=params.connections.agent.max_connections,
+    keepalive_expiry=params.connections.agent.keepalive_expiry,
+    http2=params.connections.agent.http2,
+    timeout=httpx.Timeout(params.request_timeout, connect=params.connect_timeout),
+)
+
 
 class AgentConnection(Connection):
     """Connect to target device via hyperglass-agent."""
 
-    async def collect(self) -> Iterable:  # noqa: C901
+    async def collect(  # noqa: C901
+        self, host: str = None, port: int = None
+    ) -> Iterable:
         """Connect to a device running hyperglass-agent via HTTP."""
         log.debug("Query parameters: {}", self.query)
 
-        client_params = {
-            "headers": {"Content-Type": "application/json"},
-            "timeout": params.request_timeout,
-        }
+        if host is not None:
+            log.debug(
+                "Connecting to {} via proxy {} [{}]",
+                self.device.name,
+                self.device.proxy.name,
+                f"{host}:{port}",
+            )
+
         if self.device.ssl is not None and self.device.ssl.enable:
-            with self.device.ssl.cert.open("r") as file:
-                cert = file.read()
-                if not cert:
-                    raise RestError(
-                        "SSL Certificate for device {d} has not been imported",
-                        level="danger",
-                        d=self.device.name,
-                    )
             http_protocol = "https"
-            client_params.update({"verify": str(self.device.ssl.cert)})
+            # The tunnel's local address can't match the certificate when
+            # proxied, but the device's certificate is still required.
+            verify = AGENT_CLIENTS.ssl_context(self.device, check_hostname=host is None)
             log.debug(
                 (
                     f"Using {str(self.device.ssl.cert)} to validate connection "
@@ -54,49 +66,68 @@ class AgentConnection(Connection):
             )
         else:
             http_protocol = "http"
-        endpoint = "{protocol}://{address}:{port}/query/".format(
-            protocol=http_protocol, address=self.device._target, port=self.device.port
+            verify = False
+        base_url = "{protocol}://{address}:{port}".format(
+            protocol=http_protocol,
+            address=host or self.device._target,
+            port=port or self.device.port,
         )
 
-        log.debug("URL endpoint: {}", endpoint)
+        log.debug("URL endpoint: {}", base_url)
+
+        http_client = AGENT_CLIENTS.client(self.device, base_url, verify)
+        secret = self.device.credential.password.get_secret_value()
+        batch = params.connections.agent.batch and len(self.query) > 1
 
         try:
-            async with httpx.AsyncClient(**client_params) as http_client:
-                responses = ()
-
-                for query in self.query:
-                    encoded_query = await jwt_encode(
-                        payload=query,
-                        secret=self.device.credential.password.get_secret_value(),
-                        duration=params.request_timeout,
-                    )
-                    log.debug("Encoded JWT: {}", encoded_query)
+            responses = ()
 
-                    raw_response = await http_client.post(
-                        endpoint, json={"encoded": encoded_query}
-                    )
-                    log.debug("HTTP status code: {}", raw_response.status_code)
+            async def send(
+                payload: Union[str, List[str]], endpoint: str
+            ) -> httpx.Response:
+                encoded_query = await jwt_encode(
+                    payload=payload, secret=secret, duration=params.request_timeout
+                )
+                log.debug("Encoded JWT: {}", encoded_query)
+
+                return await http_client.post(endpoint, json={"encoded": encoded_query})
+
+            if batch:
+                # Send every query in one signed request. The decoded
+                # response is a list of outputs, in the same order.
+                raw_responses = (await send(list(self.query), BATCH_ENDPOINT),)
+            else:
+                # Send each query (one per AFI) concurrently. Responses are
+                # returned in the same order as the queries.
+                raw_responses = await asyncio.gather(
+                    *(send(q, QUERY_ENDPOINT) for q in self.query)
+                )
+
+            for raw_response in raw_responses:
+                log.debug("HTTP status code: {}", raw_response.status_code)
 
-                    raw = raw_response.text
-                    log.debug("Raw Response:\n{}", raw)
+                raw = raw_response.text
+                log.debug("Raw Response:\n{}", raw)
 
-                    if raw_response.status_code == 200:
-                        decoded = await jwt_decode(
-                            payload=raw_response.json()["encoded"],
-                            secret=self.device.credential.password.get_secret_value(),
-                        )
-                        log.debug("Decoded Response:\n{}", decoded)
+                if raw_response.status_code == 200:
+                    decoded = await jwt_decode(
+                        payload=raw_response.json()["encoded"], secret=secret
+                    )
+                    log.debug("Decoded Response:\n{}", decoded)
+                    if batch:
+                        responses += tuple(decoded)
+                    else:
                         responses += (decoded,)
 
-                    elif raw_response.status_code == 204:
-                        raise ResponseEmpty(
-                            params.messages.no_output, device_name=self.device.name,
-                        )
+                elif raw_response.status_code == 204:
+                    raise ResponseEmpty(
+                        params.messages.no_output, device_name=self.device.name,
+                    )
 
-                    else:
-                        log.error(raw_response.text)
+                else:
+                    log.error(raw_response.text)
 
-        except httpx.exceptions.HTTPError as rest_error:
+        except httpx.HTTPError as rest_error:
             msg = parse_exception(rest_error)
             log.error("Error connecting to device {}: {}", self.device.name, msg)
             raise RestError(
@@ -5,7 +5,7 @@ https://github.com/ktbyers/netmiko
 
 # Standard Library
 import math
-from typing import Iterable
+from typing import Dict, Tuple, Iterable
 
 # Third Party
 from netmiko import (
@@ -21,6 +21,7 @@ from hyperglass.configuration import params
 
 # Local
 from .ssh import SSHConnection
+from ._executor import BoundedExecutor
 
 netmiko_nos_globals = {
     # Netmiko doesn't currently handle Mikrotik echo verification well,
@@ -37,6 +38,13 @@ netmiko_nos_send_args = {
 }
 
 
+NETMIKO_EXECUTOR = BoundedExecutor(
+    max_workers=params.connections.netmiko.max_workers,
+    max_per_key=params.connections.netmiko.max_per_device,
+    name="netmiko",
+)
+
+
 class NetmikoConnection(SSHConnection):
     """Handle a device connection via Netmiko."""
 
@@ -67,6 +75,7 @@ class NetmikoConnection(SSHConnection):
             "username": self.device.credential.username,
             "global_delay_factor": params.netmiko_delay_factor,
             "timeout": math.floor(params.request_timeout * 1.25),
+            "conn_timeout": params.connect_timeout,
             "session_timeout": math.ceil(params.request_timeout - 1),
             **global_args,
         }
@@ -93,16 +102,12 @@ class NetmikoConnection(SSHConnection):
                 ] = self.device.credential.password.get_secret_value()
 
         try:
-            nm_connect_direct = ConnectHandler(**driver_kwargs)
-
-            responses = ()
-
-            for query in self.query:
-                raw = nm_connect_direct.send_command(query, **send_args)
-                responses += (raw,)
-                log.debug(f'Raw response for command "{query}":\n{raw}')
-
-            nm_connect_direct.disconnect()
+            # Netmiko can't share a connection between threads, so each
+            # command (one per AFI) is run in turn on a single connection,
+            # rather than logging in to the device once per command.
+            responses = await NETMIKO_EXECUTOR.run(
+                self.device.name, self._send_commands, driver_kwargs, send_args
+            )
 
         except NetMikoTimeoutException as scrape_error:
             log.error(str(scrape_error))
@@ -134,3 +139,19 @@ class NetmikoConnection(SSHConnection):
             )
 
         return responses
+
+    def _send_commands(self, driver_kwargs: Dict, send_args: Dict) -> Tuple[str, ...]:
+        """Connect to the device & run each command (blocking)."""
+        nm_connect_direct = ConnectHandler(**driver_kwargs)
+
+        responses = ()
+
+        try:
+            for query in self.query:
+                raw = nm_connect_direct.send_command(query, **send_args)
+                responses += (raw,)
+                log.debug(f'Raw response for command "{query}":\n{raw}')
+        finally:
+            nm_connect_direct.disconnect()
+
+        return responses
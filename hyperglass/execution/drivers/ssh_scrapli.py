@@ -4,8 +4,10 @@ https://github.com/carlmontanari/scrapli
 """
 
 # Standard Library
+import re
 import math
-from typing import Sequence
+import asyncio
+from typing import Union, Sequence, AsyncIterator
 
 # Third Party
 from scrapli.driver import AsyncGenericDriver
@@ -28,12 +30,14 @@ from hyperglass.exceptions import (
     AuthError,
     ScrapeError,
     DeviceTimeout,
+    HyperglassError,
     UnsupportedDevice,
 )
 from hyperglass.configuration import params
 
 # Local
 from .ssh import SSHConnection
+from ._pool import SessionPool, PooledSession, SessionFactory
 
 SCRAPLI_DRIVER_MAP = {
     "arista_eos": AsyncEOSDriver,
@@ -54,6 +58,31 @@ driver_global_args = {
 }
 
 
+SESSION_POOL = SessionPool(
+    max_sessions=params.connections.pool.max_sessions,
+    idle_timeout=params.connections.pool.idle_timeout,
+    keepalive=params.connections.pool.keepalive,
+)
+
+
+class OneShotSession:
+    """Open a session for the duration of a context, without pooling."""
+
+    def __init__(self, factory: SessionFactory) -> None:
+        """Initialize the session."""
+        self.factory = factory
+        self.session = None
+
+    async def __aenter__(self) -> AsyncGenericDriver:
+        """Open the session."""
+        self.session = await self.factory()
+        return self.session
+
+    async def __aexit__(self, exc_type=None, exc_value=None, traceback=None) -> None:
+        """Close the session."""
+        await self.session.close()
+
+
 def _map_driver(nos: str) -> AsyncGenericDriver:
     driver = SCRAPLI_DRIVER_MAP.get(nos)
     if driver is None:
@@ -64,12 +93,10 @@ def _map_driver(nos: str) -> AsyncGenericDriver:
 class ScrapliConnection(SSHConnection):
     """Handle a device connection via Scrapli."""
 
-    async def collect(self, host: str = None, port: int = None) -> Sequence:
-        """Connect directly to a device.
-
-        Directly connects to the router via Netmiko library, returns the
-        command output.
-        """
+    def session(
+        self, host: str = None, port: int = None
+    ) -> Union[PooledSession, OneShotSession]:
+        """Get a session to the device, pooled if enabled."""
         driver = _map_driver(self.device.nos)
 
         if host is not None:
@@ -89,6 +116,8 @@ class ScrapliConnection(SSHConnection):
             "port": port or self.device.port,
             "auth_username": self.device.credential.username,
             "timeout_ops": math.floor(params.request_timeout * 1.25),
+            "timeout_socket": params.connect_timeout,
+            "timeout_transport": params.connect_timeout,
             "transport": "asyncssh",
             "auth_strict_key": False,
             "ssh_known_hosts_file": False,
@@ -110,51 +139,145 @@ class ScrapliConnection(SSHConnection):
                     "auth_private_key_passphrase"
                 ] = self.device.credential.password.get_secret_value()
 
-        driver = driver(**driver_kwargs)
-        driver.logger = log.bind(
-            logger_name=f"scrapli.{driver.host}:{driver.port}-driver"
-        )
+        async def open_session() -> AsyncGenericDriver:
+            session = driver(**driver_kwargs)
+            session.logger = log.bind(
+                logger_name=f"scrapli.{session.host}:{session.port}-driver"
+            )
+            await session.open()
+            try:
+                await session.get_prompt()
+            except BaseException:
+                await session.close()
+                raise
+            return session
+
+        if params.connections.pool.enable:
+            # A proxied device's local address changes when its tunnel is
+            # reopened, so sessions are pooled by device & proxy, and the
+            # address is only used to drop sessions to a replaced tunnel.
+            proxy = self.device.proxy.name if self.device.proxy else None
+            address = (driver_kwargs["host"], driver_kwargs["port"])
+            return SESSION_POOL.session(
+                (self.device.name, proxy), open_session, address
+            )
+        return OneShotSession(open_session)
+
+    async def collect(self, host: str = None, port: int = None) -> Sequence:
+        """Connect directly to a device.
+
+        Directly connects to the router via Netmiko library, returns the
+        command output.
+        """
+
+        async def send(connection: AsyncGenericDriver, query: str) -> str:
+            raw = await connection.send_command(query)
+            log.debug(f'Raw response for command "{query}":\n{raw.result}')
+            return raw.result
+
+        async def send_pooled(query: str) -> str:
+            async with self.session(host, port) as connection:
+                return await send(connection, query)
+
+        pool = params.connections.pool
+
         try:
-            responses = ()
-            async with driver as connection:
-                await connection.get_prompt()
+            if pool.enable and pool.max_sessions > 1 and len(self.query) > 1:
+                # scrapli can't multiplex commands on one channel, so each
+                # command (one per AFI) runs concurrently on its own pooled
+                # session. Responses are returned in the same order as the
+                # commands.
+                responses = tuple(
+                    await asyncio.gather(*(send_pooled(q) for q in self.query))
+                )
+            else:
+                # Otherwise, each command runs in turn on a single session,
+                # rather than logging in to the device once per command.
+                responses = ()
+                async with self.session(host, port) as connection:
+                    for query in self.query:
+                        responses += (await send(connection, query),)
+
+        except ScrapliException as err:
+            raise self._error(err)
+
+        if not responses:
+            raise ScrapeError(
+                params.messages.connection_error,
+                device_name=self.device.name,
+                error=params.messages.no_response,
+            )
+
+        return responses
+
+    async def stream(self, host: str = None, port: int = None) -> AsyncIterator[str]:
+        """Yield each line of output as the device produces it."""
+        try:
+            async with self.session(host, port) as connection:
                 for query in self.query:
-                    raw = await connection.send_command(query)
-                    responses += (raw.result,)
-                    log.debug(f'Raw response for command "{query}":\n{raw.result}')
+                    async for line in self._stream_command(connection, query):
+                        yield line
+
+        except ScrapliException as err:
+            raise self._error(err)
 
-        except ScrapliTimeout as err:
+    async def _stream_command(
+        self, connection: AsyncGenericDriver, query: str
+    ) -> AsyncIterator[str]:
+        """Send a command & read its output from the channel line by line."""
+        prompt = re.compile(connection.comms_prompt_pattern.encode(), flags=re.M | re.I)
+        channel = connection.channel
+
+        channel.write(query)
+        channel.send_return()
+
+        buf = b""
+        echoed = False
+
+        while True:
+            buf += await channel.read()
+
+            # Drop the device's echo of the command itself.
+            if not echoed:
+                if b"\n" not in buf:
+                    continue
+                _, buf = buf.split(b"\n", 1)
+                echoed = True
+
+            # Only complete lines are yielded. Once the remaining partial
+            # line is the device's prompt, the command is complete.
+            *lines, buf = buf.split(b"\n")
+            for line in lines:
+                yield line.decode(errors="replace").rstrip()
+
+            if prompt.search(buf):
+                break
+
+    def _error(self, err: ScrapliException) -> HyperglassError:
+        """Get the hyperglass error for a scrapli error."""
+        if isinstance(err, ScrapliTimeout):
             log.error(err)
-            raise DeviceTimeout(
+            return DeviceTimeout(
                 params.messages.connection_error,
                 device_name=self.device.name,
                 error=params.messages.request_timeout,
             )
-        except ScrapliAuthenticationFailed as err:
+
+        if isinstance(err, ScrapliAuthenticationFailed):
             log.error(
                 "Error authenticating to device {loc}: {e}",
                 loc=self.device.name,
                 e=str(err),
             )
-
-            raise AuthError(
+            return AuthError(
                 params.messages.connection_error,
                 device_name=self.device.name,
                 error=params.messages.authentication_error,
             )
-        except ScrapliException as err:
-            log.error(err)
-            raise ScrapeError(
-                params.messages.connection_error,
-                device_name=self.device.name,
-                error=params.messages.no_response,
-            )
 
-        if not responses:
-            raise ScrapeError(
-                params.messages.connection_error,
-                device_name=self.device.name,
-                error=params.messages.no_response,
-            )
-
-        return responses
+        log.error(err)
+        return ScrapeError(
+            params.messages.connection_error,
+            device_name=self.device.name,
+            error=params.messages.no_response,
+        )
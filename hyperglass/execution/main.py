@@ -7,14 +7,15 @@ hyperglass-frr API calls, returns the output back to the front end.
 """
 
 # Standard Library
-import signal
-from typing import Any, Dict, Union, Callable, Sequence
+import asyncio
+from typing import Any, Dict, Union, Callable, Optional, Sequence, Awaitable
 
 # Project
 from hyperglass.log import log
 from hyperglass.exceptions import DeviceTimeout, ResponseEmpty
 from hyperglass.models.api import Query
 from hyperglass.configuration import params
+from hyperglass.external.rpki import validate_rpki
 
 # Local
 from .drivers import Connection, AgentConnection, NetmikoConnection, ScrapliConnection
@@ -32,48 +33,56 @@ def map_driver(driver_name: str) -> Connection:
     return NetmikoConnection
 
 
-def handle_timeout(**exc_args: Any) -> Callable:
-    """Return a function signal can use to raise a timeout exception."""
+class Deadline:
+    """Track the remaining time budget of a single query.
 
-    def handler(*args: Any, **kwargs: Any) -> None:
-        raise DeviceTimeout(**exc_args)
+    Each query gets its own deadline, so concurrent queries handled by
+    the same worker cannot affect each other's timeouts.
+    """
 
-    return handler
+    def __init__(self, seconds: int, **exc_args: Any) -> None:
+        """Start the deadline clock."""
+        self._loop = asyncio.get_event_loop()
+        self.expires = self._loop.time() + seconds
+        self.exc_args = exc_args
 
+    def remaining(self, budget: Optional[int] = None) -> float:
+        """Get the time left, optionally limited to a stage's own budget."""
+        remaining = max(self.expires - self._loop.time(), 0)
+        if budget is not None:
+            remaining = min(remaining, budget)
+        return remaining
 
-async def execute(query: Query) -> Union[str, Sequence[Dict]]:
-    """Initiate query validation and execution."""
+    def stage(self, budget: Optional[int] = None) -> "Deadline":
+        """Get a deadline for a stage of the query, within this deadline."""
+        return Deadline(self.remaining(budget), **self.exc_args)
 
-    output = params.messages.general
+    async def run(self, stage: Awaitable, budget: Optional[int] = None) -> Any:
+        """Run a stage of the query, cancelling it if its budget is exceeded."""
+        try:
+            return await asyncio.wait_for(stage, timeout=self.remaining(budget))
+        except asyncio.TimeoutError:
+            raise DeviceTimeout(**self.exc_args) from None
 
-    log.debug("Received query for {}", query.json())
-    log.debug("Matched device config: {}", query.device)
 
-    mapped_driver = map_driver(query.device.driver)
-    driver = mapped_driver(query.device, query)
-
-    timeout_args = {
+def timeout_args(query: Query) -> Dict[str, Any]:
+    """Get the error arguments used if a query times out."""
+    args = {
         "unformatted_msg": params.messages.connection_error,
         "device_name": query.device.name,
         "error": params.messages.request_timeout,
     }
 
     if query.device.proxy:
-        timeout_args["proxy"] = query.device.proxy.name
+        args["proxy"] = query.device.proxy.name
 
-    signal.signal(signal.SIGALRM, handle_timeout(**timeout_args))
-    signal.alarm(params.request_timeout - 1)
+    return args
 
-    if query.device.proxy:
-        proxy = driver.setup_proxy()
-        with proxy() as tunnel:
-            response = await driver.collect(
-                tunnel.local_bind_host, tunnel.local_bind_port
-            )
-    else:
-        response = await driver.collect()
 
-    output = await driver.parsed_response(response)
+def validate_output(
+    query: Query, output: Union[str, Sequence[Dict]]
+) -> Union[str, Sequence[Dict]]:
+    """Ensure parsed output is not empty."""
 
     if isinstance(output, str):
         # If the output is a string (not structured) and is empty,
@@ -91,6 +100,69 @@ async def execute(query: Query) -> Union[str, Sequence[Dict]]:
             )
 
     log.debug("Output for query: {}:\n{}", query.json(), repr(output))
-    signal.alarm(0)
 
     return output
+
+
+async def execute(query: Query) -> Union[str, Sequence[Dict]]:
+    """Initiate query validation and execution."""
+
+    log.debug("Received query for {}", query.json())
+    log.debug("Matched device config: {}", query.device)
+
+    mapped_driver = map_driver(query.device.driver)
+    driver = mapped_driver(query.device, query)
+
+    deadline = Deadline(params.request_timeout - 1, **timeout_args(query))
+
+    if query.device.proxy:
+        collect = driver.proxied_collect()
+    else:
+        collect = driver.collect()
+
+    response = await deadline.run(collect, params.command_timeout)
+
+    output = await deadline.run(driver.parsed_response(response), params.parse_timeout)
+    output = await validate_rpki(output, deadline.remaining())
+
+    return validate_output(query, output)
+
+
+async def execute_stream(
+    query: Query, on_line: Callable[[str], Any]
+) -> Union[str, Sequence[Dict]]:
+    """Execute a query, passing each line of output to on_line as it is received."""
+
+    log.debug("Received streamed query for {}", query.json())
+    log.debug("Matched device config: {}", query.device)
+
+    mapped_driver = map_driver(query.device.driver)
+    driver = mapped_driver(query.device, query)
+
+    deadline = Deadline(params.request_timeout - 1, **timeout_args(query))
+    collect_deadline = deadline.stage(params.command_timeout)
+
+    if query.device.proxy:
+        stream = driver.proxied_stream()
+    else:
+        stream = driver.stream()
+
+    lines = []
+
+    try:
+        while True:
+            try:
+                line = await collect_deadline.run(stream.__anext__())
+            except StopAsyncIteration:
+                break
+            lines.append(line)
+            on_line(line)
+    finally:
+        await stream.aclose()
+
+    response = ("\n".join(lines),)
+
+    output = await deadline.run(driver.parsed_response(response), params.parse_timeout)
+    output = await validate_rpki(output, deadline.remaining())
+
+    return validate_output(query, output)
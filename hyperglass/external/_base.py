@@ -4,6 +4,7 @@
 import re
 import json as _json
 import socket
+import asyncio
 from json import JSONDecodeError
 from socket import gaierror
 
@@ -148,7 +149,8 @@ class BaseExternal:
 
     async def _atest(self):
         """Open a low-level connection to the base URL to ensure its port is open."""
-        return self._test()
+        loop = asyncio.get_event_loop()
+        return await loop.run_in_executor(None, self._test)
 
     def _build_request(self, **kwargs):
         """Process requests parameters into structure usable by http library."""
@@ -8,17 +8,31 @@
 import re
 import socket
 import asyncio
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 # Project
 from hyperglass.log import log
-from hyperglass.cache import SyncCache, AsyncCache
+from hyperglass.cache import SyncCache, use_cache
+from hyperglass.external import pfx2as
+from hyperglass.util.tasks import run_in_background
 from hyperglass.configuration import REDIS_CONFIG, params
 
 DEFAULT_KEYS = ("asn", "ip", "prefix", "country", "rir", "allocated", "org")
 
 CACHE_KEY = "hyperglass.external.bgptools"
 
+# Time in seconds each resource's network info is cached.
+CACHE_TIMEOUT = 86400
+
+# Time in seconds lookups are collected for before they're sent together.
+BATCH_WINDOW = 0.05
+
+# Maximum number of targets sent in a single bulk query.
+MAX_BATCH_SIZE = 500
+
+# Number of bytes read from the whois socket at a time.
+READ_SIZE = 65536
+
 
 def parse_whois(output: str, targets: List[str]) -> Dict[str, str]:
     """Parse raw whois output from bgp.tools.
@@ -79,7 +93,7 @@ async def run_whois(targets: List[str]) -> str:
     # Read the response
     response = b""
     while True:
-        data = await reader.read(128)
+        data = await reader.read(READ_SIZE)
         if data:
             response += data
         else:
@@ -105,7 +119,7 @@ def run_whois_sync(targets: List[str]) -> str:
     # Read the response
     response = b""
     while True:
-        data = sock.recv(128)
+        data = sock.recv(READ_SIZE)
         if data:
             response += data
 
@@ -118,42 +132,152 @@ def run_whois_sync(targets: List[str]) -> str:
     return response.decode()
 
 
+class WhoisBatcher:
+    """Send lookups from concurrent callers to bgp.tools as one bulk query.
+
+    Lookups are collected for a short window, or until the batch is
+    full, then sent together. Each caller waits only for the targets it
+    requested, & targets already pending are shared between callers.
+    """
+
+    def __init__(self, window: float, max_batch: int) -> None:
+        """Initialize the batcher."""
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._timer: Optional[asyncio.Handle] = None
+        self._inflight = 0
+        self._batches = 0
+        self._targets = 0
+        self._largest = 0
+
+    def __repr__(self) -> str:
+        """Represent batcher state."""
+        return "WhoisBatcher({})".format(
+            ", ".join(f"{k}={v}" for k, v in self.stats().items())
+        )
+
+    def stats(self) -> Dict[str, float]:
+        """Get the number of pending & in-flight targets, & batch sizes."""
+        mean = round(self._targets / self._batches, 2) if self._batches else 0.0
+        return {
+            "pending": len(self._pending),
+            "inflight": self._inflight,
+            "batches": self._batches,
+            "targets": self._targets,
+            "mean_batch_size": mean,
+            "max_batch_size": self._largest,
+        }
+
+    async def lookup(self, targets: List[str]) -> Dict[str, Dict[str, str]]:
+        """Get bgp.tools data for each target found, in a shared bulk query."""
+        loop = asyncio.get_event_loop()
+        futures = []
+
+        for target in targets:
+            if target not in self._pending:
+                self._pending[target] = loop.create_future()
+            futures.append(self._pending[target])
+
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None and self._pending:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        # Shield the shared futures, so a cancelled caller doesn't cancel
+        # other callers' lookups.
+        results = await asyncio.gather(*(asyncio.shield(f) for f in futures))
+        return {t: r for t, r in zip(targets, results) if r is not None}
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        pending, self._pending = list(self._pending.items()), {}
+        for i in range(0, len(pending), self.max_batch):
+            run_in_background(self._send(dict(pending[i : i + self.max_batch])))
+
+    async def _send(self, batch: Dict[str, asyncio.Future]) -> None:
+        targets = list(batch)
+        self._inflight += len(targets)
+        self._batches += 1
+        self._targets += len(targets)
+        self._largest = max(self._largest, len(targets))
+        parsed = {}
+
+        try:
+            whoisdata = await asyncio.wait_for(
+                run_whois(targets), timeout=params.request_timeout
+            )
+            if whoisdata:
+                parsed = parse_whois(whoisdata, targets)
+        except Exception as err:
+            log.error("Error querying bgp.tools: {}", str(err) or repr(err))
+        finally:
+            self._inflight -= len(targets)
+
+        for target, future in batch.items():
+            if not future.done():
+                future.set_result(parsed.get(target))
+
+        log.debug("Sent {} targets to bgp.tools, {!r}", len(targets), self)
+
+
+WHOIS = WhoisBatcher(window=BATCH_WINDOW, max_batch=MAX_BATCH_SIZE)
+
+
+def target_key(target: str) -> str:
+    """Get the cache key of a target's network info."""
+    return f"{CACHE_KEY}.{target}"
+
+
 async def network_info(*targets: str) -> Dict[str, Dict[str, str]]:
     """Get ASN, Containing Prefix, and other info about an internet resource."""
 
     targets = [str(t) for t in targets]
-    cache = AsyncCache(db=params.cache.database, **REDIS_CONFIG)
+    cache = use_cache()
 
     # Set default data structure.
     data = {t: {k: "" for k in DEFAULT_KEYS} for t in targets}
 
-    # Get all cached bgp.tools data.
-    cached = await cache.get_dict(CACHE_KEY)
+    # Use the local pfx2as file for any routed targets, if configured.
+    # Once loaded, looking targets up never reads the file.
+    local = pfx2as.network_info(targets) if pfx2as.loaded() else {}
+    for t, info in local.items():
+        data[t].update(info)
+        log.debug("Using pfx2as network info for {}", t)
+
+    targets = [t for t in targets if t not in local]
 
-    # Try to use cached data for each of the items in the list of
-    # resources.
-    for t in targets:
+    if not targets:
+        return data
 
-        if t in cached:
+    # Get cached bgp.tools data for only the requested resources.
+    cached = await cache.get_many([target_key(t) for t in targets])
+
+    for t, info in zip(targets, cached):
+        if info is not None:
             # Reassign the cached network info to the matching resource.
-            data[t] = cached[t]
+            data[t] = info
             log.debug("Using cached network info for {}", t)
 
     # Remove cached items from the resource list so they're not queried.
-    targets = [t for t in targets if t not in cached]
+    targets = [t for t, info in zip(targets, cached) if info is None]
 
     try:
         if targets:
-            whoisdata = await run_whois(targets)
+            found = await WHOIS.lookup(targets)
 
-            if whoisdata:
-                # If the response is not empty, parse it.
-                data.update(parse_whois(whoisdata, targets))
+            if found:
+                data.update(found)
 
-                # Cache the response
-                for t in targets:
-                    await cache.set_dict(CACHE_KEY, t, data[t])
-                    log.debug("Cached network info for {}", t)
+                # Only cache the resources bgp.tools returned, so a partial
+                # or failed response is retried on the next lookup.
+                await cache.set_many(
+                    {target_key(t): i for t, i in found.items()}, seconds=CACHE_TIMEOUT
+                )
+                log.debug("Cached network info for {}", ", ".join(found))
 
     except Exception as err:
         log.error(str(err))
@@ -170,33 +294,45 @@ def network_info_sync(*targets: str) -> Dict[str, Dict[str, str]]:
     # Set default data structure.
     data = {t: {k: "" for k in DEFAULT_KEYS} for t in targets}
 
-    # Get all cached bgp.tools data.
-    cached = cache.get_dict(CACHE_KEY)
+    # Use the local pfx2as file for any routed targets, if configured.
+    local = pfx2as.network_info(targets)
+    for t, info in local.items():
+        data[t].update(info)
+        log.debug("Using pfx2as network info for {}", t)
+
+    targets = [t for t in targets if t not in local]
 
-    # Try to use cached data for each of the items in the list of
-    # resources.
-    for t in targets:
+    if not targets:
+        return data
 
-        if t in cached:
+    # Get cached bgp.tools data for only the requested resources.
+    cached = cache.get_many([target_key(t) for t in targets])
+
+    for t, info in zip(targets, cached):
+        if info is not None:
             # Reassign the cached network info to the matching resource.
-            data[t] = cached[t]
+            data[t] = info
             log.debug("Using cached network info for {}", t)
 
     # Remove cached items from the resource list so they're not queried.
-    targets = [t for t in targets if t not in cached]
+    targets = [t for t, info in zip(targets, cached) if info is None]
 
     try:
         if targets:
             whoisdata = run_whois_sync(targets)
 
-            if whoisdata:
-                # If the response is not empty, parse it.
-                data.update(parse_whois(whoisdata, targets))
+            # If the response is not empty, parse it.
+            found = parse_whois(whoisdata, targets) if whoisdata else {}
+
+            if found:
+                data.update(found)
 
-                # Cache the response
-                for t in targets:
-                    cache.set_dict(CACHE_KEY, t, data[t])
-                    log.debug("Cached network info for {}", t)
+                # Only cache the resources bgp.tools returned, so a partial
+                # or failed response is retried on the next lookup.
+                cache.set_many(
+                    {target_key(t): i for t, i in found.items()}, seconds=CACHE_TIMEOUT
+                )
+                log.debug("Cached network info for {}", ", ".join(found))
 
     except Exception as err:
         log.error(str(err))
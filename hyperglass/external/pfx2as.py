@@ -0,0 +1,106 @@
+"""Look up IP addresses' containing prefix & origin ASN in a local pfx2as file.
+
+Supported formats, optionally gzip-compressed:
+- CAIDA RouteViews pfx2as: `1.1.1.0<TAB>24<TAB>13335`
+- Prefix & origin ASN: `1.1.1.0/24 13335`, e.g. bgp.tools' table.txt
+"""
+
+# Standard Library
+import gzip
+from typing import Dict, Iterable, Optional
+from pathlib import Path
+from functools import lru_cache
+
+# Project
+from hyperglass.log import log
+from hyperglass.util.files import WatchedFile
+from hyperglass.configuration import params
+from hyperglass.util.prefixes import PrefixMap
+
+
+def load_pfx2as(path: Path) -> PrefixMap:
+    """Load each prefix & its origin ASN from a pfx2as file."""
+    opener = gzip.open if path.suffix == ".gz" else open
+    prefixes = PrefixMap()
+
+    with opener(path, "rt") as f:
+        for line in f:
+            fields = line.split()
+
+            if len(fields) < 2 or fields[0].startswith("#"):
+                continue
+
+            if "/" in fields[0]:
+                prefix, origin = fields[0], fields[1]
+            elif len(fields) >= 3:
+                prefix, origin = "/".join(fields[:2]), fields[2]
+            else:
+                continue
+
+            # Multi-origin prefixes list each ASN, e.g. `13335_209242`.
+            asn = origin.replace(",", "_").split("_")[0].upper().replace("AS", "")
+
+            try:
+                prefixes.add(prefix, asn)
+            except ValueError:
+                continue
+
+    log.debug("Loaded {!r} from {}", prefixes, str(path))
+    return prefixes
+
+
+@lru_cache(maxsize=None)
+def use_pfx2as() -> WatchedFile:
+    """Get this worker's pfx2as prefixes, reloaded when the file changes."""
+    return WatchedFile(
+        path=params.pfx2as.file,
+        load=load_pfx2as,
+        interval=params.pfx2as.reload_interval,
+    )
+
+
+def enabled() -> bool:
+    """Determine if a pfx2as file is configured."""
+    return params.pfx2as.file is not None
+
+
+def loaded() -> bool:
+    """Determine if the pfx2as file is loaded & reloaded in the background."""
+    return enabled() and use_pfx2as().ready
+
+
+def lookup(target: str) -> Optional[Dict[str, str]]:
+    """Get an IP address's containing prefix & origin ASN, if it is routed.
+
+    While the file is first loaded in the background, None is returned,
+    so lookups fall back to bgp.tools rather than waiting for it.
+    """
+    prefixes = use_pfx2as().get(wait=False)
+
+    if prefixes is None:
+        return None
+
+    try:
+        match = prefixes.longest(target)
+    except ValueError:
+        return None
+
+    if match is None:
+        return None
+
+    prefix, (asn, *_) = match
+    return {"asn": asn, "ip": target, "prefix": str(prefix)}
+
+
+def network_info(targets: Iterable[str]) -> Dict[str, Dict[str, str]]:
+    """Get the containing prefix & origin ASN of each routed IP address."""
+    if not enabled():
+        return {}
+
+    try:
+        found = {t: lookup(t) for t in targets}
+    except Exception as err:
+        log.error("Error looking up prefixes in pfx2as file: {}", str(err))
+        return {}
+
+    return {t: info for t, info in found.items() if info is not None}
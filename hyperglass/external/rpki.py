@@ -1,51 +1,222 @@
-"""Validate RPKI state via Cloudflare GraphQL API."""
+"""Validate RPKI state via Cloudflare GraphQL API, or a local VRP file."""
+
+# Standard Library
+import json
+import asyncio
+from typing import Any, Dict, List, Tuple, Union, Iterable, Optional, Sequence
+from pathlib import Path
+from functools import lru_cache
+from ipaddress import ip_network
 
 # Project
 from hyperglass.log import log
-from hyperglass.cache import SyncCache
-from hyperglass.configuration import REDIS_CONFIG, params
+from hyperglass.cache import use_cache
+from hyperglass.util.files import WatchedFile
+from hyperglass.configuration import params
+from hyperglass.util.prefixes import PrefixMap
 from hyperglass.external._base import BaseExternal
 
 RPKI_STATE_MAP = {"Invalid": 0, "Valid": 1, "NotFound": 2, "DEFAULT": 3}
 RPKI_NAME_MAP = {v: k for k, v in RPKI_STATE_MAP.items()}
 CACHE_KEY = "hyperglass.external.rpki"
 
-cache = SyncCache(db=params.cache.database, **REDIS_CONFIG)
+# Maximum number of concurrent requests to the RPKI API.
+MAX_REQUESTS = 4
+
+Origin = Tuple[str, int]
+
+
+def route_origin(route: Dict) -> Optional[Origin]:
+    """Get a route's prefix & origin ASN, if its RPKI state can be validated."""
+    as_path = route["as_path"]
+
+    if len(as_path) == 0:
+        # Internal routes have no origin ASN.
+        return None
+
+    try:
+        net = ip_network(route["prefix"])
+    except ValueError:
+        return None
+
+    # Only do external RPKI lookups for global prefixes.
+    if not net.is_global:
+        return None
+
+    return (route["prefix"], as_path[-1])
+
+
+def origin_key(origin: Origin) -> str:
+    """Get the cache key of a prefix & origin ASN's RPKI state."""
+    return "{}.{}@{}".format(CACHE_KEY, *origin)
+
+
+def load_vrps(path: Path) -> PrefixMap:
+    """Load validated ROA payloads from an rpki-client or Routinator JSON export."""
+    with path.open("r") as f:
+        roas = json.load(f).get("roas", [])
 
+    vrps = PrefixMap()
 
-def rpki_state(prefix, asn):
-    """Get RPKI state and map to expected integer."""
-    log.debug("Validating RPKI State for {p} via AS{a}", p=prefix, a=asn)
+    for roa in roas:
+        asn = roa["asn"]
+        if isinstance(asn, str):
+            # Routinator exports ASNs as strings, e.g. "AS13335".
+            asn = int(asn.upper().replace("AS", ""))
 
-    state = 3
-    ro = f"{prefix}@{asn}"
+        net = ip_network(roa["prefix"], strict=False)
+        max_length = roa.get("maxLength") or net.prefixlen
+        vrps.add(net, (asn, int(max_length)))
 
-    cached = cache.get_dict(CACHE_KEY, ro)
+    log.debug("Loaded {} VRPs for {!r}", len(roas), vrps)
+    return vrps
 
-    if cached is not None:
-        state = cached
-    else:
 
-        ql = 'query GetValidation {{ validation(prefix: "{}", asn: {}) {{ state }} }}'
-        query = ql.format(prefix, asn)
+@lru_cache(maxsize=None)
+def use_vrps() -> WatchedFile:
+    """Get this worker's validated ROA payloads, reloaded when the file changes."""
+    return WatchedFile(
+        path=params.structured.rpki.vrp_file,
+        load=load_vrps,
+        interval=params.structured.rpki.reload_interval,
+    )
+
+
+def origin_state(vrps: PrefixMap, prefix: str, asn: int) -> int:
+    """Validate a prefix & origin ASN against validated ROA payloads (RFC 6811)."""
+    net = ip_network(prefix, strict=False)
+    covered = False
+
+    for _, payloads in vrps.iter_covering(net):
+        covered = True
+        for vrp_asn, max_length in payloads:
+            if vrp_asn == asn != 0 and net.prefixlen <= max_length:
+                return RPKI_STATE_MAP["Valid"]
+
+    if covered:
+        return RPKI_STATE_MAP["Invalid"]
+
+    return RPKI_STATE_MAP["NotFound"]
+
+
+def local_states(origins: Sequence[Origin]) -> Dict[Origin, int]:
+    """Validate prefixes & origin ASNs against the local VRP file."""
+    vrps = use_vrps().get()
+    return {origin: origin_state(vrps, *origin) for origin in origins}
+
+
+async def query_states(client: BaseExternal, origins: Sequence[Origin]) -> Dict:
+    """Validate multiple prefixes & origin ASNs in a single GraphQL query."""
+    ql = 'v{}: validation(prefix: "{}", asn: {}) {{ state }}'
+    query = "query GetValidation {{ {} }}".format(
+        " ".join(ql.format(i, *origin) for i, origin in enumerate(origins))
+    )
+    response = await client._apost("/api/graphql", data={"query": query})
+    data = response.get("data") or {}
 
+    states = {}
+    for i, origin in enumerate(origins):
+        validation_state = (data.get(f"v{i}") or {}).get("state")
+        if validation_state in RPKI_STATE_MAP:
+            states[origin] = RPKI_STATE_MAP[validation_state]
+
+    return states
+
+
+async def fetch_states(
+    origins: List[Origin], timeout: Optional[float] = None
+) -> Dict[Origin, int]:
+    """Validate prefixes & origin ASNs in concurrent batches, & cache each state.
+
+    States not validated within timeout seconds are left out.
+    """
+    size = params.structured.rpki.batch_size
+    batches = [origins[i : i + size] for i in range(0, len(origins), size)]
+    limit = asyncio.Semaphore(MAX_REQUESTS)
+    states = {}
+
+    async def fetch(client: BaseExternal, batch: List[Origin]) -> None:
+        async with limit:
+            try:
+                states.update(await query_states(client, batch))
+            except Exception as err:
+                log.error(str(err))
+
+    async def fetch_all() -> None:
+        # The client's context manager suppresses exceptions, including
+        # cancellation on timeout, so the session is closed explicitly.
+        client = BaseExternal(base_url="https://rpki.cloudflare.com")
+        try:
+            await client._atest()
+            await asyncio.gather(*(fetch(client, b) for b in batches))
+        finally:
+            client._session.close()
+            await client._asession.aclose()
+
+    try:
+        await asyncio.wait_for(fetch_all(), timeout=timeout)
+    except asyncio.TimeoutError:
+        log.error("Timed out validating RPKI state of {} prefixes", len(origins))
+    except Exception as err:
+        log.error(str(err))
+
+    if states:
+        await use_cache().set_many(
+            {origin_key(o): s for o, s in states.items()},
+            seconds=params.structured.rpki.cache_timeout,
+        )
+
+    return states
+
+
+async def rpki_states(
+    origins: Iterable[Origin], timeout: Optional[float] = None
+) -> Dict[Origin, int]:
+    """Get the RPKI state of each unique prefix & origin ASN."""
+    origins = list(dict.fromkeys(origins))
+
+    if params.structured.rpki.mode == "local":
+        # Loading the VRP file may take a few seconds, so it is done
+        # in a thread, along with the lookups.
+        loop = asyncio.get_event_loop()
         try:
-            with BaseExternal(base_url="https://rpki.cloudflare.com") as client:
-                response = client._post("/api/graphql", data={"query": query})
-            validation_state = (
-                response.get("data", {}).get("validation", {}).get("state", "DEFAULT")
-            )
-            state = RPKI_STATE_MAP[validation_state]
-            cache.set_dict(CACHE_KEY, ro, state)
+            return await loop.run_in_executor(None, local_states, origins)
         except Exception as err:
-            log.error(str(err))
-            state = 3
+            log.error("Error validating RPKI state locally: {}", str(err))
+            return {}
+
+    cached = await use_cache().get_many([origin_key(o) for o in origins])
 
-    msg = "RPKI Validation State for {} via AS{} is {}".format(
-        prefix, asn, RPKI_NAME_MAP[state]
+    states = {o: s for o, s in zip(origins, cached) if s is not None}
+    missing = [o for o in origins if o not in states]
+
+    log.debug(
+        "Validating RPKI state of {} prefixes, {} cached", len(origins), len(states)
     )
-    if cached is not None:
-        msg += " [CACHED]"
 
-    log.debug(msg)
-    return state
+    if missing:
+        states.update(await fetch_states(missing, timeout))
+
+    return states
+
+
+async def validate_rpki(
+    output: Union[str, Dict, Any], timeout: Optional[float] = None
+) -> Union[str, Dict, Any]:
+    """Set the RPKI state of every route in structured output, unless router.
+
+    Routes not validated within timeout seconds are set to the unknown
+    state, rather than failing the query.
+    """
+    if params.structured.rpki.mode == "router" or not isinstance(output, Dict):
+        return output
+
+    routes = output.get("routes", [])
+    origins = [route_origin(route) for route in routes]
+    states = await rpki_states((o for o in origins if o is not None), timeout)
+
+    for route, origin in zip(routes, origins):
+        if origin is not None:
+            route["rpki_state"] = states.get(origin, 3)
+
+    return output
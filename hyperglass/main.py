@@ -33,7 +33,7 @@ if node_major != MIN_NODE_VERSION:
 from hyperglass.compat._asyncio import aiorun
 
 # Local
-from .util import cpu_count, clear_redis_cache, format_listen_address
+from .util import cpu_count, clear_stale_cache, format_listen_address
 from .cache import SyncCache
 from .configuration import (
     URL_DEV,
@@ -75,7 +75,19 @@ def check_redis_instance() -> bool:
 
     cache = SyncCache(db=params.cache.database, **REDIS_CONFIG)
     cache.test()
-    log.debug("Redis is running at: {}:{}", REDIS_CONFIG["host"], REDIS_CONFIG["port"])
+
+    if params.cache.backend == "redis":
+        log.debug(
+            "Redis is running at: {}:{}", REDIS_CONFIG["host"], REDIS_CONFIG["port"]
+        )
+    elif params.cache.backend == "sqlite":
+        log.debug("Using local cache database at: {}", REDIS_CONFIG["path"])
+    elif workers > 1:
+        log.warning(
+            "The memory cache backend is not shared between workers, "
+            "so each of the {} workers keeps its own cache",
+            workers,
+        )
     return True
 
 
@@ -91,13 +103,14 @@ async def build_ui() -> bool:
     return True
 
 
-async def clear_cache():
-    """Clear the Redis cache on shutdown."""
+def clear_stale_entries() -> bool:
+    """Clear query output cached by another version of the configuration."""
     try:
-        await clear_redis_cache(db=params.cache.database, config=REDIS_CONFIG)
-    except RuntimeError as e:
-        log.error(str(e))
-        pass
+        deleted = clear_stale_cache()
+        log.debug("Cleared {} stale cache entries", deleted)
+    except Exception as e:
+        log.error("Error clearing stale cache entries: {}", str(e))
+    return True
 
 
 def cache_config() -> bool:
@@ -127,6 +140,7 @@ def on_starting(server: Arbiter):
         await gather(build_ui(), cache_config())
 
     check_redis_instance()
+    clear_stale_entries()
     aiorun(build_ui())
     cache_config()
 
@@ -142,14 +156,9 @@ def on_starting(server: Arbiter):
 def on_exit(server: Arbiter):
     """Gunicorn shutdown tasks."""
 
+    # Cached query output is kept, so it can be reused once restarted.
     log.critical("Stopping hyperglass {}", __version__)
 
-    async def runner():
-        if not params.developer_mode:
-            await clear_cache()
-
-    aiorun(runner())
-
 
 class HyperglassWSGI(BaseApplication):
     """Custom gunicorn app."""
@@ -1,6 +1,6 @@
 """Query & Response Validation Models."""
 # Local
-from .query import Query
+from .query import Query, BatchQuery
 from .response import (
     QueryError,
     InfoResponse,
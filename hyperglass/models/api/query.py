@@ -4,14 +4,22 @@
 import json
 import hashlib
 import secrets
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 # Third Party
-from pydantic import BaseModel, StrictStr, constr, validator
+from pydantic import (
+    BaseModel,
+    StrictStr,
+    PrivateAttr,
+    constr,
+    validator,
+    root_validator,
+)
 
 # Project
-from hyperglass.exceptions import InputInvalid
-from hyperglass.configuration import params, devices
+from hyperglass.exceptions import InputInvalid, HyperglassError
+from hyperglass.configuration import CONFIG_VERSION, params, devices
 
 # Local
 from .types import SupportedQuery
@@ -22,6 +30,27 @@ from .validators import (
     validate_community_select,
 )
 from ..config.vrf import Vrf
+from ..config.devices import Device
+
+# Query output is cached in keys namespaced by configuration version,
+# device ID & query type, so it can be invalidated selectively.
+CACHE_NAMESPACE = "hyperglass.query.output"
+
+# Query types whose targets are IP addresses or prefixes.
+IP_QUERY_TYPES = ("bgp_route", "ping", "traceroute")
+
+# VRF fields that IP target validation depends on.
+TARGET_VRF_FIELDS = {
+    "ipv4": {"access_list", "force_cidr"},
+    "ipv6": {"access_list", "force_cidr"},
+}
+
+
+def cache_namespace(
+    version: str = "*", device: str = "*", query_type: str = "*"
+) -> str:
+    """Get a pattern matching cached query output keys."""
+    return f"{CACHE_NAMESPACE}.{version}.{device}.{query_type}.*"
 
 
 def get_vrf_object(vrf_name: str) -> Vrf:
@@ -41,6 +70,20 @@ def get_vrf_object(vrf_name: str) -> Vrf:
     raise InputInvalid(params.messages.vrf_not_found, vrf_name=vrf_name)
 
 
+def get_device_vrf(vrf_object: Vrf, device: Device) -> Vrf:
+    """Match a device's own VRF object from a VRF object."""
+
+    for vrf in device.vrfs:
+        if vrf == vrf_object:
+            return vrf
+
+    raise InputInvalid(
+        params.messages.vrf_not_associated,
+        vrf_name=vrf_object.display_name,
+        device_name=device.name,
+    )
+
+
 class Query(BaseModel):
     """Validation model for input query parameters."""
 
@@ -84,6 +127,13 @@ class Query(BaseModel):
         super().__init__(**kwargs)
         self.timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
 
+    @classmethod
+    def construct(cls, *args, **kwargs) -> "Query":
+        """Create a query from already-validated values, with a UTC timestamp."""
+        query = super().construct(*args, **kwargs)
+        query.timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        return query
+
     def __repr__(self):
         """Represent only the query fields."""
         return (
@@ -92,9 +142,37 @@ class Query(BaseModel):
             f"query_target={str(self.query_target)})"
         )
 
+    def canonical(self) -> str:
+        """Represent the query by its normalized fields.
+
+        Equivalent queries, e.g. a location by name or by ID, have the
+        same canonical representation.
+        """
+        return json.dumps(
+            (
+                CONFIG_VERSION,
+                self.device._id,
+                self.query_type,
+                self.query_vrf._id,
+                str(self.query_target),
+            )
+        )
+
     def digest(self):
-        """Create SHA256 hash digest of model representation."""
-        return hashlib.sha256(repr(self).encode()).hexdigest()
+        """Create SHA256 hash digest of the query's canonical representation."""
+        return hashlib.sha256(self.canonical().encode()).hexdigest()
+
+    def cache_key(self) -> str:
+        """Create the query's namespaced cache key."""
+        return ".".join(
+            (
+                CACHE_NAMESPACE,
+                CONFIG_VERSION,
+                self.device._id,
+                str(self.query_type),
+                self.digest(),
+            )
+        )
 
     def random(self):
         """Create a random string to prevent client or proxy caching."""
@@ -183,20 +261,8 @@ class Query(BaseModel):
 
         vrf_object = get_vrf_object(value)
         device = devices[values["query_location"]]
-        device_vrf = None
 
-        for vrf in device.vrfs:
-            if vrf == vrf_object:
-                device_vrf = vrf
-                break
-
-        if device_vrf is None:
-            raise InputInvalid(
-                params.messages.vrf_not_associated,
-                vrf_name=vrf_object.display_name,
-                device_name=device.name,
-            )
-        return device_vrf
+        return get_device_vrf(vrf_object, device)
 
     @validator("query_target")
     def validate_query_target(cls, value, values):
@@ -228,3 +294,127 @@ class Query(BaseModel):
         validate_args = validator_args_map[query_type]
 
         return validate_func(*validate_args)
+
+
+class BatchQuery(BaseModel):
+    """Validation model for batch query parameters."""
+
+    query_locations: List[StrictStr] = []
+    query_network: Optional[StrictStr]
+    query_type: SupportedQuery
+    query_vrf: StrictStr
+    query_target: constr(strip_whitespace=True, min_length=1)
+    _targets: Dict[Optional[str], Any] = PrivateAttr(default_factory=dict)
+
+    class Config:
+        """Pydantic model configuration."""
+
+        fields = {
+            "query_locations": {
+                "title": params.web.text.query_location,
+                "description": "Router/Location Names",
+                "example": ["router01", "router02"],
+            },
+            "query_network": {
+                "title": "Network",
+                "description": "Query every location in this network",
+                "example": "primary",
+            },
+            "query_type": Query.Config.fields["query_type"],
+            "query_vrf": Query.Config.fields["query_vrf"],
+            "query_target": Query.Config.fields["query_target"],
+        }
+
+    @property
+    def locations(self) -> List[str]:
+        """Get every requested location, without duplicates."""
+        locations = [devices[loc]._id for loc in self.query_locations]
+
+        if self.query_network is not None:
+            locations += [
+                d._id for d in devices.objects if d.network.name == self.query_network
+            ]
+
+        return list(dict.fromkeys(locations))
+
+    def query(self, location: str) -> Query:
+        """Get a single location's query from the batch's validated fields.
+
+        Only the location's VRF is checked, and the target is validated
+        once per distinct VRF settings rather than once per location.
+        """
+        vrf = get_device_vrf(get_vrf_object(self.query_vrf), devices[location])
+
+        return Query.construct(
+            query_location=location,
+            query_type=self.query_type,
+            query_vrf=vrf,
+            query_target=self.target(vrf),
+        )
+
+    def target(self, vrf: Vrf) -> Any:
+        """Validate the query target for a device's VRF, once per VRF settings.
+
+        IP targets are validated against the VRF's access lists, & may be
+        replaced by their containing prefix. Other targets don't depend on
+        the VRF, so are validated once for the whole batch.
+        """
+        key = None
+        if self.query_type in IP_QUERY_TYPES:
+            key = vrf.json(include=TARGET_VRF_FIELDS)
+
+        if key not in self._targets:
+            try:
+                self._targets[key] = Query.validate_query_target(
+                    self.query_target,
+                    {"query_type": self.query_type, "query_vrf": vrf},
+                )
+            except HyperglassError as err:
+                self._targets[key] = err
+
+        target = self._targets[key]
+        if isinstance(target, HyperglassError):
+            raise target
+        return target
+
+    @validator("query_type")
+    def validate_query_type(cls, value):
+        """Ensure query_type is enabled."""
+        return Query.validate_query_type(value)
+
+    @validator("query_vrf")
+    def validate_query_vrf(cls, value):
+        """Ensure query_vrf is defined."""
+        get_vrf_object(value)
+        return value
+
+    @validator("query_locations", each_item=True)
+    def validate_query_locations(cls, value):
+        """Ensure each query_location is defined."""
+        return Query.validate_query_location(value)
+
+    @validator("query_network")
+    def validate_query_network(cls, value):
+        """Ensure query_network is defined."""
+
+        if value not in {d.network.name for d in devices.objects}:
+            raise InputInvalid(
+                params.messages.invalid_field,
+                level="warning",
+                input=value,
+                field="Network",
+            )
+        return value
+
+    @root_validator(skip_on_failure=True)
+    def validate_locations(cls, values):
+        """Ensure at least one location or network is requested."""
+
+        if not values.get("query_locations") and values.get("query_network") is None:
+            raise InputInvalid(
+                params.messages.invalid_field,
+                level="warning",
+                input="[]",
+                field=params.web.text.query_location,
+            )
+        return values
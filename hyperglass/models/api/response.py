@@ -64,6 +64,7 @@ class QueryResponse(BaseModel):
     level: ResponseLevel = "success"
     random: StrictStr
     cached: StrictBool
+    stale: StrictBool = False
     runtime: StrictInt
     keywords: List[StrictStr] = []
     timestamp: StrictStr
@@ -85,6 +86,10 @@ class QueryResponse(BaseModel):
                 "description": "Random string to prevent client or intermediate caching.",
                 "example": "504cbdb47eb8310ca237bf512c3e10b44b0a3d85868c4b64a20037dc1c3ef857",
             },
+            "stale": {
+                "title": "Stale",
+                "description": "`true` if the response is from a cached query that has expired, & is being refreshed.",
+            },
             "runtime": {
                 "title": "Runtime",
                 "description": "Time it took to run the query in seconds.",
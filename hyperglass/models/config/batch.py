@@ -0,0 +1,22 @@
+"""Validation model for batch queries."""
+
+# Third Party
+from pydantic import Field, StrictInt, StrictBool
+
+# Local
+from ..main import HyperglassModel
+
+
+class Batch(HyperglassModel):
+    """Validation model for params.batch."""
+
+    enable: StrictBool = Field(
+        True,
+        title="Enable",
+        description="Enable or disable the `/api/query/batch/` endpoint, which runs the same query on many locations at once.",
+    )
+    max_concurrent: StrictInt = Field(
+        10,
+        title="Maximum Concurrent Queries",
+        description="Maximum number of batch sub-queries executed at once, across all batch requests, per hyperglass worker.",
+    )
@@ -1,24 +1,237 @@
 """Validation model for Redis cache config."""
 
 # Standard Library
-from typing import Union, Optional
+import importlib.util
+from typing import List, Union, Optional
+from pathlib import Path
 
 # Third Party
-from pydantic import SecretStr, StrictInt, StrictStr, StrictBool, IPvAnyAddress
+from pydantic import (
+    SecretStr,
+    StrictInt,
+    StrictStr,
+    StrictBool,
+    IPvAnyAddress,
+    constr,
+    validator,
+    root_validator,
+)
 
 # Local
 from ..main import HyperglassModel
 
+Algorithms = constr(regex=r"^(zlib|lzma|zstd)$")
+Backends = constr(regex=r"^(redis|memory|sqlite)$")
+
+
+class LocalCache(HyperglassModel):
+    """Validation model for params.cache.local."""
+
+    enable: StrictBool = False
+    max_entries: StrictInt = 1024
+    ttl: StrictInt = 10
+
+    class Config:
+        """Pydantic model configuration."""
+
+        title = "Local Cache"
+        description = (
+            "In-memory cache of recently read cache entries, per hyperglass worker."
+        )
+        fields = {
+            "enable": {
+                "description": "Keep recently read query output & external lookups in memory, in front of Redis."
+            },
+            "max_entries": {
+                "description": "Maximum number of entries kept in memory, per hyperglass worker."
+            },
+            "ttl": {
+                "description": "Time in seconds an entry is kept in memory before it is read from Redis again."
+            },
+        }
+
+
+class Compression(HyperglassModel):
+    """Validation model for params.cache.compression."""
+
+    enable: StrictBool = True
+    algorithm: Algorithms = "zlib"
+    min_size: StrictInt = 65536
+    level: Optional[StrictInt]
+
+    class Config:
+        """Pydantic model configuration."""
+
+        title = "Compression"
+        description = "Compression of large query output stored in the cache."
+        fields = {
+            "enable": {"description": "Compress large query output in the cache."},
+            "algorithm": {
+                "description": "Compression algorithm. `zstd` requires the `zstandard` Python package."
+            },
+            "min_size": {
+                "description": "Minimum size in bytes of query output to compress."
+            },
+            "level": {
+                "description": "Compression level. If unset, the algorithm's default level is used."
+            },
+        }
+
+    @validator("algorithm")
+    def validate_algorithm(cls, value: str) -> str:
+        """Ensure the compression algorithm's package is installed."""
+        if value == "zstd" and importlib.util.find_spec("zstandard") is None:
+            raise ValueError(
+                "zstd compression is enabled, but the 'zstandard' package is not installed."
+            )
+        return value
+
+
+class Timeouts(HyperglassModel):
+    """Validation model for params.cache.timeouts."""
+
+    bgp_route: Optional[StrictInt]
+    bgp_community: Optional[StrictInt]
+    bgp_aspath: Optional[StrictInt]
+    ping: Optional[StrictInt]
+    traceroute: Optional[StrictInt]
+
+    class Config:
+        """Pydantic model configuration."""
+
+        title = "Query Type Timeouts"
+        description = "Time in seconds each query type's output is kept in the cache. If unset, `timeout` is used."
+
+
+class AdaptiveTimeout(HyperglassModel):
+    """Validation model for params.cache.adaptive."""
+
+    enable: StrictBool = False
+    min_timeout: StrictInt = 30
+    max_timeout: StrictInt = 900
+
+    class Config:
+        """Pydantic model configuration."""
+
+        title = "Adaptive Timeout"
+        description = "Cache query output for longer if it is expensive to produce & often requested."
+        fields = {
+            "enable": {
+                "description": "Set each query's cache timeout from its runtime & number of recent requests."
+            },
+            "min_timeout": {
+                "description": "Minimum time in seconds query output is kept in the cache."
+            },
+            "max_timeout": {
+                "description": "Maximum time in seconds query output is kept in the cache."
+            },
+        }
+
+
+class WarmQuery(HyperglassModel):
+    """Validation model for params.cache.warming.queries."""
+
+    query_location: StrictStr
+    query_type: StrictStr
+    query_vrf: Optional[StrictStr]
+    query_target: StrictStr
+
+    class Config:
+        """Pydantic model configuration."""
+
+        title = "Warmed Query"
+        description = "Query to keep in the cache."
+        fields = {
+            "query_location": {"description": "Device name or ID."},
+            "query_type": {"description": "Query type, e.g. `bgp_route`."},
+            "query_vrf": {
+                "description": "VRF name or ID. If unset, the default VRF is used."
+            },
+            "query_target": {"description": "Query target."},
+        }
+
+
+class Warming(HyperglassModel):
+    """Validation model for params.cache.warming."""
+
+    enable: StrictBool = False
+    interval: StrictInt = 300
+    popular: StrictInt = 10
+    max_per_device: StrictInt = 1
+    queries: List[WarmQuery] = []
+
+    class Config:
+        """Pydantic model configuration."""
+
+        title = "Cache Warming"
+        description = "Run popular & configured queries in the background, so they are always cached."
+        fields = {
+            "enable": {
+                "description": "Run popular & configured queries in the background, so they are always cached."
+            },
+            "interval": {
+                "description": "Time in seconds between runs of popular & configured queries."
+            },
+            "popular": {
+                "description": "Number of the most requested recent queries to run."
+            },
+            "max_per_device": {
+                "description": "Maximum number of concurrent background queries per device."
+            },
+            "queries": {"description": "Queries to run."},
+        }
+
+
+class Invalidation(HyperglassModel):
+    """Validation model for params.cache.invalidation."""
+
+    enable: StrictBool = False
+    api_key: Optional[SecretStr]
+
+    class Config:
+        """Pydantic model configuration."""
+
+        title = "Cache Invalidation"
+        description = (
+            "API endpoint for clearing a device's or query type's cached output."
+        )
+        fields = {
+            "enable": {
+                "description": "Enable the `/api/cache/` endpoint, which clears cached query output."
+            },
+            "api_key": {
+                "description": "API key required in the `X-API-Key` header of requests to the `/api/cache/` endpoint."
+            },
+        }
+
+    @root_validator(skip_on_failure=True)
+    def validate_api_key(cls, values):
+        """Ensure an API key is set if the endpoint is enabled."""
+        if values["enable"] and values.get("api_key") is None:
+            raise ValueError("Cache invalidation is enabled, but no api_key is set.")
+        return values
+
 
 class Cache(HyperglassModel):
     """Validation model for params.cache."""
 
+    backend: Backends = "redis"
+    path: Optional[Path]
     host: Union[IPvAnyAddress, StrictStr] = "localhost"
     port: StrictInt = 6379
     database: StrictInt = 1
     password: Optional[SecretStr]
     timeout: StrictInt = 120
     show_text: StrictBool = True
+    single_flight: StrictBool = True
+    stale_while_revalidate: StrictInt = 0
+    timeouts: Timeouts = Timeouts()
+    adaptive: AdaptiveTimeout = AdaptiveTimeout()
+    popularity_window: StrictInt = 3600
+    warming: Warming = Warming()
+    invalidation: Invalidation = Invalidation()
+    local: LocalCache = LocalCache()
+    compression: Compression = Compression()
 
     class Config:
         """Pydantic model configuration."""
@@ -26,6 +239,12 @@ class Cache(HyperglassModel):
         title = "Cache"
         description = "Redis server & cache timeout configuration."
         fields = {
+            "backend": {
+                "description": "Where the cache is stored. `memory` & `sqlite` don't require a Redis server."
+            },
+            "path": {
+                "description": "Path to the `sqlite` backend's database file. Defaults to `cache.db` in the hyperglass directory."
+            },
             "host": {"description": "Redis server IP address or hostname."},
             "port": {"description": "Redis server TCP port."},
             "database": {"description": "Redis server database ID."},
@@ -34,4 +253,31 @@ class Cache(HyperglassModel):
                 "description": "Time in seconds query output will be kept in the Redis cache."
             },
             "show_test": {description: "Show the cache text in the hyperglass UI."},
+            "single_flight": {
+                "description": "Share a single device session between identical queries received while the first is still running."
+            },
+            "stale_while_revalidate": {
+                "description": "Time in seconds an expired query output is still returned from the cache, while it is refreshed in the background."
+            },
+            "timeouts": {
+                "description": "Time in seconds each query type's output is kept in the cache. If unset, `timeout` is used."
+            },
+            "adaptive": {
+                "description": "Cache query output for longer if it is expensive to produce & often requested."
+            },
+            "popularity_window": {
+                "description": "Time in seconds over which requests for each query are counted."
+            },
+            "warming": {
+                "description": "Run popular & configured queries in the background, so they are always cached."
+            },
+            "invalidation": {
+                "description": "API endpoint for clearing a device's or query type's cached output."
+            },
+            "local": {
+                "description": "In-memory cache of recently read cache entries, per hyperglass worker."
+            },
+            "compression": {
+                "description": "Compression of large query output stored in the cache."
+            },
         }
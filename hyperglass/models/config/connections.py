@@ -0,0 +1,108 @@
+"""Validation model for device connection handling."""
+
+# Standard Library
+import importlib.util
+
+# Third Party
+from pydantic import Field, StrictInt, StrictBool, validator
+
+# Local
+from ..main import HyperglassModel
+
+
+class SessionPool(HyperglassModel):
+    """Validation model for params.connections.pool."""
+
+    enable: StrictBool = Field(
+        False,
+        title="Enable",
+        description="Keep authenticated scrapli sessions open between queries, so subsequent queries to the same device can reuse them.",
+    )
+    max_sessions: StrictInt = Field(
+        2,
+        title="Maximum Sessions",
+        description="Maximum number of concurrent sessions per device, per hyperglass worker.",
+    )
+    idle_timeout: StrictInt = Field(
+        300,
+        title="Idle Timeout",
+        description="Time in seconds an unused session is kept open before it is closed.",
+    )
+    keepalive: StrictInt = Field(
+        60,
+        title="Keepalive Interval",
+        description="Time in seconds between keepalives sent over idle sessions.",
+    )
+
+
+class NetmikoExecutor(HyperglassModel):
+    """Validation model for params.connections.netmiko."""
+
+    max_workers: StrictInt = Field(
+        16,
+        title="Maximum Workers",
+        description="Maximum number of threads running Netmiko queries, per hyperglass worker.",
+    )
+    max_per_device: StrictInt = Field(
+        2,
+        title="Maximum Per Device",
+        description="Maximum number of concurrent Netmiko queries per device, per hyperglass worker.",
+    )
+
+
+class Tunnels(HyperglassModel):
+    """Validation model for params.connections.tunnels."""
+
+    idle_timeout: StrictInt = Field(
+        300,
+        title="Idle Timeout",
+        description="Time in seconds an unused SSH tunnel to a proxy is kept open before it is closed. If set to `0`, tunnels are closed as soon as they are unused.",
+    )
+    keepalive: StrictInt = Field(
+        30,
+        title="Keepalive Interval",
+        description="Time in seconds between keepalives sent to proxies over open SSH tunnels.",
+    )
+
+
+class AgentClient(HyperglassModel):
+    """Validation model for params.connections.agent."""
+
+    max_connections: StrictInt = Field(
+        4,
+        title="Maximum Connections",
+        description="Maximum number of open HTTP connections per hyperglass-agent device, per hyperglass worker.",
+    )
+    keepalive_expiry: StrictInt = Field(
+        60,
+        title="Keepalive Expiry",
+        description="Time in seconds an unused HTTP connection to a hyperglass-agent device is kept open before it is closed.",
+    )
+    http2: StrictBool = Field(
+        False,
+        title="HTTP/2",
+        description="Use HTTP/2 with hyperglass-agent devices that support it. Only applies to devices using SSL, and requires the `h2` Python package.",
+    )
+    batch: StrictBool = Field(
+        False,
+        title="Batch Queries",
+        description="Send every command for a query to hyperglass-agent in a single signed request, rather than one request per command. Requires a hyperglass-agent version that supports batched queries.",
+    )
+
+    @validator("http2")
+    def validate_http2(cls, value: bool) -> bool:
+        """Ensure HTTP/2 support is installed if enabled."""
+        if value and importlib.util.find_spec("h2") is None:
+            raise ValueError(
+                "HTTP/2 is enabled, but the 'h2' package is not installed."
+            )
+        return value
+
+
+class Connections(HyperglassModel):
+    """Validation model for params.connections."""
+
+    pool: SessionPool = SessionPool()
+    netmiko: NetmikoExecutor = NetmikoExecutor()
+    tunnels: Tunnels = Tunnels()
+    agent: AgentClient = AgentClient()
@@ -70,6 +70,16 @@ class Docs(HyperglassModel):
         description="Request a query response per-location.",
         summary="Query the Looking Glass",
     )
+    stream: EndpointConfig = EndpointConfig(
+        title="Stream Query",
+        description="Request a ping or traceroute, receiving each line of output as Server-Sent Events as soon as the device produces it.",
+        summary="Stream a Query",
+    )
+    batch: EndpointConfig = EndpointConfig(
+        title="Submit Batch Query",
+        description="Request the same query from many locations at once. Each location's response is streamed as a line of JSON as soon as it completes.",
+        summary="Query Many Locations",
+    )
     devices: EndpointConfig = EndpointConfig(
         title="Devices",
         description="List of all devices/locations with associated identifiers, display names, networks, & VRFs.",
@@ -101,6 +111,14 @@ class Docs(HyperglassModel):
                 "title": "Query API Endpoint",
                 "description": "`/api/query/` API documentation options.",
             },
+            "stream": {
+                "title": "Stream Query API Endpoint",
+                "description": "`/api/query/stream/` API documentation options.",
+            },
+            "batch": {
+                "title": "Batch Query API Endpoint",
+                "description": "`/api/query/batch/` API documentation options.",
+            },
             "devices": {
                 "title": "Devices API Endpoint",
                 "description": "`/api/devices` API documentation options.",
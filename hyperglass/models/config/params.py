@@ -19,12 +19,15 @@ from pydantic import (
 from .web import Web
 from .docs import Docs
 from ..main import HyperglassModel
+from .batch import Batch
 from .cache import Cache
+from .pfx2as import Pfx2as
 from ..fields import IntFloat
 from .logging import Logging
 from .queries import Queries
 from .messages import Messages
 from .structured import Structured
+from .connections import Connections
 
 Localhost = constr(regex=r"localhost")
 
@@ -95,6 +98,21 @@ class Params(HyperglassModel):
         title="Request Timeout",
         description="Global timeout in seconds for all requests. The frontend application (UI) uses this field's exact value when submitting queries. The backend application uses this field's value, minus one second, for its own timeout handling. This is to ensure a contextual timeout error is presented to the end user in the event of a backend application timeout.",
     )
+    connect_timeout: StrictInt = Field(
+        15,
+        title="Connect Timeout",
+        description="Time in seconds a query may spend establishing a connection to a device. The remaining `request_timeout` budget always takes precedence.",
+    )
+    command_timeout: Optional[StrictInt] = Field(
+        None,
+        title="Command Timeout",
+        description="Time in seconds a query may spend connecting to a device and collecting its output. If unset, the remaining `request_timeout` budget is used.",
+    )
+    parse_timeout: Optional[StrictInt] = Field(
+        None,
+        title="Parse Timeout",
+        description="Time in seconds a query may spend parsing a device's output. If unset, the remaining `request_timeout` budget is used.",
+    )
     listen_address: Optional[Union[IPvAnyAddress, Localhost]] = Field(
         None,
         title="Listen Address",
@@ -118,10 +136,13 @@ class Params(HyperglassModel):
     google_analytics: Optional[StrictStr]
 
     # Sub Level Params
+    batch: Batch = Batch()
     cache: Cache = Cache()
+    connections: Connections = Connections()
     docs: Docs = Docs()
     logging: Logging = Logging()
     messages: Messages = Messages()
+    pfx2as: Pfx2as = Pfx2as()
     queries: Queries = Queries()
     structured: Structured = Structured()
     web: Web = Web()
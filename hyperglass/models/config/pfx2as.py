@@ -0,0 +1,25 @@
+"""Validation model for local IP-to-prefix/ASN lookups."""
+
+# Standard Library
+from typing import Optional
+
+# Third Party
+from pydantic import Field, FilePath, StrictInt
+
+# Local
+from ..main import HyperglassModel
+
+
+class Pfx2as(HyperglassModel):
+    """Validation model for params.pfx2as."""
+
+    file: Optional[FilePath] = Field(
+        None,
+        title="File",
+        description="Path to a pfx2as file, used to look up IP addresses' containing prefix & origin ASN before falling back to bgp.tools.",
+    )
+    reload_interval: StrictInt = Field(
+        300,
+        title="Reload Interval",
+        description="Time in seconds between checks for changes to the pfx2as file.",
+    )
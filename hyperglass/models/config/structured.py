@@ -1,16 +1,16 @@
 """Structured data configuration variables."""
 
 # Standard Library
-from typing import List
+from typing import List, Optional
 
 # Third Party
-from pydantic import StrictStr, constr
+from pydantic import FilePath, StrictInt, StrictStr, constr, root_validator
 
 # Local
 from ..main import HyperglassModel
 
 StructuredCommunityMode = constr(regex=r"(permit|deny)")
-StructuredRPKIMode = constr(regex=r"(router|external)")
+StructuredRPKIMode = constr(regex=r"(router|external|local)")
 
 
 class StructuredCommunities(HyperglassModel):
@@ -24,6 +24,17 @@ class StructuredRpki(HyperglassModel):
     """Control structured data response for RPKI state."""
 
     mode: StructuredRPKIMode = "router"
+    cache_timeout: StrictInt = 3600
+    batch_size: StrictInt = 100
+    vrp_file: Optional[FilePath]
+    reload_interval: StrictInt = 60
+
+    @root_validator
+    def validate_vrp_file(cls, values):
+        """Require a VRP file if local validation is enabled."""
+        if values.get("mode") == "local" and values.get("vrp_file") is None:
+            raise ValueError("'vrp_file' is required when 'mode' is 'local'")
+        return values
 
 
 class Structured(HyperglassModel):
@@ -10,7 +10,6 @@ from pydantic import StrictInt, StrictStr, StrictBool, constr, validator
 
 # Project
 from hyperglass.configuration import params
-from hyperglass.external.rpki import rpki_state
 
 # Local
 from ..main import HyperglassModel
@@ -69,35 +68,27 @@ class ParsedRouteEntry(HyperglassModel):
 
     @validator("rpki_state")
     def validate_rpki_state(cls, value, values):
-        """If external RPKI validation is enabled, get validation state."""
+        """If external RPKI validation is enabled, reset unverifiable states.
+
+        Routes are validated externally all at once, after parsing. See
+        `hyperglass.external.rpki.validate_rpki`.
+        """
 
         if params.structured.rpki.mode == "router":
             # If router validation is enabled, return the value as-is.
             return value
 
-        elif params.structured.rpki.mode == "external":
-            # If external validation is enabled, validate the prefix
-            # & asn with Cloudflare's RPKI API.
-            as_path = values["as_path"]
-
-            if len(as_path) == 0:
-                # If the AS_PATH length is 0, i.e. for an internal route,
-                # return RPKI Unknown state.
-                return 3
-            else:
-                # Get last ASN in path
-                asn = as_path[-1]
+        if len(values["as_path"]) == 0:
+            # If the AS_PATH length is 0, i.e. for an internal route,
+            # return RPKI Unknown state.
+            return 3
 
         try:
-            net = ip_network(values["prefix"])
+            ip_network(values["prefix"])
         except ValueError:
             return 3
 
-        # Only do external RPKI lookups for global prefixes.
-        if net.is_global:
-            return rpki_state(prefix=values["prefix"], asn=asn)
-        else:
-            return value
+        return value
 
 
 class ParsedRoutes(HyperglassModel):
@@ -59,30 +59,47 @@ async def write_env(variables: Dict) -> str:
     return f"Wrote {env_vars} to {str(env_file)}"
 
 
-async def clear_redis_cache(db: int, config: Dict) -> bool:
-    """Clear the Redis cache."""
-    # Third Party
-    import aredis
+def sync_clear_redis_cache(
+    device: Optional[str] = None, query_type: Optional[str] = None
+) -> int:
+    """Clear cached query output, optionally only a device's or query type's."""
+    # Project
+    from hyperglass.cache import SyncCache
+    from hyperglass.configuration import REDIS_CONFIG, params, devices
+    from hyperglass.models.api.query import cache_namespace
 
     try:
-        redis_instance = aredis.StrictRedis(db=db, **config)
-        await redis_instance.flushdb()
-    except Exception as e:
-        raise RuntimeError(f"Error clearing cache: {str(e)}") from None
-    return True
+        if device is not None:
+            # Match a device by its name or ID.
+            device = devices[device]._id
+
+        pattern = cache_namespace(device=device or "*", query_type=query_type or "*")
+        cache = SyncCache(db=params.cache.database, **REDIS_CONFIG)
+        return cache.delete_matching(pattern)
+    except BaseException as err:
+        raise RuntimeError(str(err)) from err
 
 
-def sync_clear_redis_cache() -> None:
-    """Clear the Redis cache."""
+def clear_stale_cache() -> int:
+    """Clear query output cached by another version of the configuration."""
     # Project
     from hyperglass.cache import SyncCache
-    from hyperglass.configuration import REDIS_CONFIG, params
+    from hyperglass.configuration import REDIS_CONFIG, CONFIG_VERSION, params
+    from hyperglass.external.rpki import CACHE_KEY as RPKI_CACHE_KEY
+    from hyperglass.models.api.query import cache_namespace
+    from hyperglass.external.bgptools import CACHE_KEY as BGPTOOLS_CACHE_KEY
 
-    try:
-        cache = SyncCache(db=params.cache.database, **REDIS_CONFIG)
-        cache.clear()
-    except BaseException as err:
-        raise RuntimeError from err
+    cache = SyncCache(db=params.cache.database, **REDIS_CONFIG)
+
+    deleted = cache.delete_matching(
+        cache_namespace(), keep=cache_namespace(version=CONFIG_VERSION)
+    )
+
+    # Previous versions cached all RPKI states & bgp.tools data in a
+    # single hash each, which grew with every lookup & never expired.
+    deleted += cache.instance.delete(RPKI_CACHE_KEY, BGPTOOLS_CACHE_KEY)
+
+    return deleted
 
 
 def set_app_path(required: bool = False) -> Path:
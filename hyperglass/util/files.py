@@ -1,15 +1,29 @@
 """Utilities for working with files."""
 
 # Standard Library
+import time
 import shutil
+import asyncio
 from queue import Queue
-from typing import List, Tuple, Union, Iterable, Optional, Generator
+from typing import (
+    List,
+    Tuple,
+    Union,
+    Generic,
+    TypeVar,
+    Callable,
+    Iterable,
+    Optional,
+    Generator,
+)
 from pathlib import Path
-from threading import Thread
+from threading import Lock, Thread
 
 # Project
 from hyperglass.log import log
 
+T = TypeVar("T")
+
 
 async def move_files(  # noqa: C901
     src: Path, dst: Path, files: Iterable[Path]
@@ -161,3 +175,91 @@ def check_path(
         pass
 
     return result
+
+
+class WatchedFile(Generic[T]):
+    """Load a file on first use, & reload it whenever it changes.
+
+    The file's modification time is checked at most once per interval,
+    either by readers or, once started, by a background task. A reloaded
+    file replaces the previous one only once it has loaded successfully,
+    so readers always see a complete, consistent copy.
+    """
+
+    def __init__(self, path: Path, load: Callable[[Path], T], interval: int) -> None:
+        """Initialize the file without loading it."""
+        self.path = Path(path)
+        self.load = load
+        self.interval = interval
+        self._lock = Lock()
+        self._value: Optional[T] = None
+        self._mtime: Optional[int] = None
+        self._checked = 0.0
+        self._runner: Optional[asyncio.Future] = None
+
+    def __repr__(self) -> str:
+        """Represent file state."""
+        return f"WatchedFile(path={self.path}, interval={self.interval})"
+
+    @property
+    def ready(self) -> bool:
+        """Determine if the file is loaded & reloaded in the background.
+
+        Once ready, get() never reads the file.
+        """
+        watching = self._runner is not None and not self._runner.done()
+        return watching and self._value is not None
+
+    def get(self, wait: bool = True) -> Optional[T]:
+        """Get the file's loaded contents, reloading it if it has changed.
+
+        If the file is reloaded in the background, readers never wait for
+        it to be reloaded, only for the first load. If wait is False, None
+        is returned until the background task has loaded the file.
+        """
+        watching = self._runner is not None and not self._runner.done()
+
+        if self._value is None and watching and not wait:
+            return None
+
+        if self._value is None or (not watching and time.monotonic() >= self._checked):
+            self.reload()
+
+        return self._value
+
+    def reload(self) -> None:
+        """Load the file if it has changed since it was last loaded."""
+        with self._lock:
+            self._checked = time.monotonic() + self.interval
+
+            try:
+                mtime = self.path.stat().st_mtime_ns
+                if mtime != self._mtime:
+                    value = self.load(self.path)
+                    self._value, self._mtime = value, mtime
+                    log.info("Loaded {}", str(self.path))
+
+            except Exception as err:
+                if self._value is None:
+                    raise
+                log.error("Error reloading {}: {}", str(self.path), str(err))
+
+    def start(self) -> None:
+        """Load the file & reload it on the interval in a background thread."""
+        if self._runner is None or self._runner.done():
+            self._runner = asyncio.ensure_future(self._run())
+
+    def stop(self) -> None:
+        """Stop reloading the file in the background."""
+        if self._runner is not None:
+            self._runner.cancel()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_event_loop()
+        while True:
+            try:
+                await loop.run_in_executor(None, self.reload)
+            except Exception as err:
+                log.error("Error loading {}: {}", str(self.path), str(err))
+
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,80 @@
+"""Longest-prefix match lookups of IP prefixes."""
+
+# Standard Library
+from bisect import insort
+from typing import Any, Dict, List, Tuple, Union, Iterator, Optional
+from ipaddress import IPv4Network, IPv6Network, ip_network
+
+Network = Union[IPv4Network, IPv6Network]
+
+NETWORK_CLASSES = {4: IPv4Network, 6: IPv6Network}
+
+
+class PrefixMap:
+    """Map IP prefixes to values, for longest-prefix match lookups.
+
+    Prefixes are indexed by address family & prefix length, and each
+    lookup masks the address once per prefix length present. This takes
+    far less memory than a node per bit, and each lookup costs at most
+    one hash lookup per distinct prefix length.
+    """
+
+    def __init__(self) -> None:
+        """Initialize an empty map."""
+        self._tables: Dict[int, Dict[int, Dict[int, List[Any]]]] = {4: {}, 6: {}}
+        self._lengths: Dict[int, List[int]] = {4: [], 6: []}
+        self._size = 0
+
+    def __repr__(self) -> str:
+        """Represent map state."""
+        return f"PrefixMap(prefixes={self._size})"
+
+    def __len__(self) -> int:
+        """Get the number of prefixes."""
+        return self._size
+
+    def add(self, prefix: Union[str, Network], value: Any) -> Network:
+        """Add a value for a prefix. Each prefix may have multiple values."""
+        net = ip_network(prefix, strict=False)
+        tables, lengths = self._tables[net.version], self._lengths[net.version]
+
+        if net.prefixlen not in tables:
+            tables[net.prefixlen] = {}
+            # Lengths are kept sorted from longest to shortest.
+            insort(lengths, -net.prefixlen)
+
+        values = tables[net.prefixlen].setdefault(int(net.network_address), [])
+        if not values:
+            self._size += 1
+        values.append(value)
+        return net
+
+    def iter_covering(
+        self, prefix: Union[str, Network]
+    ) -> Iterator[Tuple[Network, List[Any]]]:
+        """Iterate over each prefix containing a prefix or address, longest first."""
+        net = ip_network(prefix, strict=False)
+        tables = self._tables[net.version]
+        bits = net.max_prefixlen
+        address = int(net.network_address)
+
+        for length in self._lengths[net.version]:
+            length = -length
+            if length > net.prefixlen:
+                continue
+
+            key = address >> (bits - length) << (bits - length)
+            values = tables[length].get(key)
+
+            if values is not None:
+                yield NETWORK_CLASSES[net.version]((key, length)), values
+
+    def covering(self, prefix: Union[str, Network]) -> List[Tuple[Network, List]]:
+        """Get each prefix containing a prefix or address, longest first."""
+        return list(self.iter_covering(prefix))
+
+    def longest(
+        self, prefix: Union[str, Network]
+    ) -> Optional[Tuple[Network, List[Any]]]:
+        """Get the longest prefix containing a prefix or address, & its values."""
+        return next(self.iter_covering(prefix), None)
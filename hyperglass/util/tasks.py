@@ -0,0 +1,28 @@
+"""Run tasks in the background without losing track of them."""
+
+# Standard Library
+import asyncio
+from typing import Set, Awaitable
+
+# Project
+from hyperglass.log import log
+
+# The event loop only keeps weak references to tasks, so each background
+# task is referenced here until it is done.
+BACKGROUND_TASKS: Set[asyncio.Future] = set()
+
+
+def _task_done(task: asyncio.Future) -> None:
+    """Stop referencing a completed task, & log any exception it raised."""
+    BACKGROUND_TASKS.discard(task)
+
+    if not task.cancelled() and task.exception() is not None:
+        log.error("Error in background task: {}", repr(task.exception()))
+
+
+def run_in_background(awaitable: Awaitable) -> asyncio.Future:
+    """Run an awaitable in the background, referencing it until it is done."""
+    task = asyncio.ensure_future(awaitable)
+    BACKGROUND_TASKS.add(task)
+    task.add_done_callback(_task_done)
+    return task